@@ -1,114 +1,55 @@
-import os
-import json
-import requests
-import sqlite3
-from datetime import datetime, timezone, timedelta
+import time
+from datetime import datetime, timezone
 import telebot
 from telebot import types
 
-# ---------------------------
-# Load configuration from config.json
-# ---------------------------
-with open("config.json", "r") as f:
-    config = json.load(f)
-# config example:
-# {
-#   "bot_token": "...",
-#   "adminids": [123456789],
-#   "groupid": -1001234567890,
-#   "apikey": "...",
-#   "tocheck": 10
-# }
-
-FIXED_MATCHES_FILE = "FixedMatches.json"
-PREDICTIONS_DB_FILE = "predictions.db"
-USERS_DIR = "users"
+import delivery
+import http_client
+import predictions_db
+from monitor_scheduler import SCHEDULER
+from live_state import LIVE_STATE
+from live_cards import CARDS
+from live_coalescer import COALESCER
+from fixture_catalog import FixtureCatalog
+from callback_router import get_router
+import config_service
+from config_service import is_admin
+import user_store
+import markup_cache
+from fixed_matches import (
+    load_fixed_matches, is_fixture_set, add_fixed_match, remove_fixed_match, REGISTRY
+)
 
 # Used to hold partial admin states (e.g., for broadcast flow)
 ADMIN_STATES = {}
 
-# To store fixture data from the external API while setting matches
-CURRENT_FIXTURES = {}
+# Upcoming fixtures from the external API, refreshed in the background
+# (apikey, leagues and season are read from config.json on every refresh)
+CATALOG = FixtureCatalog()
 
 # ---------------------------
 # Helpers
 # ---------------------------
-def load_fixed_matches():
-    if os.path.exists(FIXED_MATCHES_FILE):
-        try:
-            with open(FIXED_MATCHES_FILE, "r") as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-def save_fixed_matches(data):
-    with open(FIXED_MATCHES_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-def is_fixture_set(fixture_id):
-    fixed = load_fixed_matches()
-    return any(str(match.get("fixture_id")) == str(fixture_id) for match in fixed)
-
 def fetch_fixtures():
     """
-    Fetch upcoming fixtures from external API for league=39, season=2024, status=NS,
-    limited to the next 20 days.
+    Upcoming fixtures (status NS) for the configured leagues/season in the
+    next 20 days, soonest first, served from the background-refreshed catalog.
     """
-    url = "https://v3.football.api-sports.io/fixtures"
-    params = {
-        "league": 39,   # Premier League
-        "season": 2024,
-        "status": "NS"
-    }
-    headers = {
-        "x-apisports-key": config["apikey"]
-    }
-    try:
-        response = requests.get(url, headers=headers, params=params)
-        data = response.json()
-        fixtures = data.get("response", [])
-    except:
-        fixtures = []
-
-    now = datetime.now(timezone.utc)
-    upcoming = []
-    for fix in fixtures:
-        date_str = fix["fixture"]["date"]
-        try:
-            fix_date = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-        except:
-            continue
-        if now <= fix_date <= now + timedelta(days=20):
-            upcoming.append(fix)
-    upcoming.sort(key=lambda f: datetime.fromisoformat(
-        f["fixture"]["date"].replace("Z", "+00:00")
-    ))
-    return upcoming
+    return [fix for (_, fix) in CATALOG.upcoming()]
 
 def count_predictions_for_fixture(fixture_id):
     """
-    Return how many predictions are stored for fixture_<fixture_id> in predictions.db
-    Returns 0 if table doesn't exist or no entries.
+    Return how many predictions are stored for the fixture in predictions.db.
+    Returns 0 if there are no entries.
     """
-    table_name = f"fixture_{fixture_id}"
-    conn = sqlite3.connect(PREDICTIONS_DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute(f'SELECT COUNT(*) FROM "{table_name}"')
-        (cnt,) = c.fetchone()
+        return predictions_db.count_predictions(fixture_id)
     except:
-        cnt = 0
-    conn.close()
-    return cnt
+        return 0
 
 def get_total_users():
-    """Count how many user .json files exist in users/."""
-    if not os.path.exists(USERS_DIR):
-        return 0
-    files = os.listdir(USERS_DIR)
-    # Only count .json
-    return sum(1 for f in files if f.endswith(".json"))
+    """Count how many user profiles exist in the user store."""
+    return user_store.count_users()
 
 # ---------------------------
 # Admin Menu Displays
@@ -118,15 +59,7 @@ def show_admin_main_menu(bot, chat_id, message_id=None):
     Show or update the main admin menu.
     """
     text = "👋 Hey Manager, what are you gonna cook today? 🍳"
-    markup = types.InlineKeyboardMarkup()
-    btn_set_match    = types.InlineKeyboardButton("⚽ Set Match", callback_data="set_match")
-    btn_fixture      = types.InlineKeyboardButton("📋 Fixture", callback_data="fixture")
-    btn_participants = types.InlineKeyboardButton("👥 Participants", callback_data="participants")
-    btn_broadcast    = types.InlineKeyboardButton("📢 Broadcast", callback_data="broadcast")
-    btn_remove_match = types.InlineKeyboardButton("🗑️ Remove Match", callback_data="remove_match")
-    markup.row(btn_set_match, btn_fixture)
-    markup.row(btn_participants, btn_broadcast)
-    markup.add(btn_remove_match)
+    markup = markup_cache.admin_main_menu()
 
     if message_id:
         # Try editing existing message
@@ -141,31 +74,28 @@ def show_admin_main_menu(bot, chat_id, message_id=None):
 
 def show_match_selection(bot, call):
     """
-    Show upcoming fixtures from external API with an option to set them.
+    Show upcoming fixtures from the fixture catalog with an option to set them.
     """
-    global CURRENT_FIXTURES
-    fixtures = fetch_fixtures()
-    CURRENT_FIXTURES = {}
+    fixed_ids = REGISTRY.ids()
     markup = types.InlineKeyboardMarkup()
 
-    for fix in fixtures:
+    for (f_date, fix) in CATALOG.upcoming():
         fixture_id = str(fix["fixture"]["id"])
-        date_str = fix["fixture"]["date"]
-        try:
-            f_date = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-        except:
-            continue
         date_txt = f_date.strftime("%d %b")
         home_team = fix["teams"]["home"]["name"]
         away_team = fix["teams"]["away"]["name"]
         btn_text = f"📅 {date_txt}: {home_team} vs {away_team}"
-        if is_fixture_set(fixture_id):
+        if len(CATALOG.leagues) > 1:
+            btn_text += f" ({fix['league']['name']})"
+        if fixture_id in fixed_ids:
             btn_text += " 🔴"
-        CURRENT_FIXTURES[fixture_id] = fix
         markup.add(types.InlineKeyboardButton(btn_text, callback_data=f"setmatch:{fixture_id}"))
 
     markup.add(types.InlineKeyboardButton("🔙 Back", callback_data="admin_back"))
     text = "👉 Select a match to set:"
+    if CATALOG.refreshed_at:
+        age_min = int(time.time() - CATALOG.refreshed_at) // 60
+        text += f"\n(fixture list updated {age_min} min ago)"
     try:
         bot.edit_message_text(chat_id=call.message.chat.id,
                               message_id=call.message.message_id,
@@ -235,8 +165,7 @@ def show_fixtures_info(bot, call):
             )
     text = "\n".join(lines)
 
-    markup = types.InlineKeyboardMarkup()
-    markup.add(types.InlineKeyboardButton("🔙 Back", callback_data="admin_back"))
+    markup = markup_cache.back_button("admin_back")
     try:
         bot.edit_message_text(call.message.chat.id, call.message.message_id,
                               text, parse_mode="HTML", reply_markup=markup)
@@ -247,14 +176,97 @@ def show_fixtures_info(bot, call):
     except:
         pass
 
+def show_delivery_jobs(bot, call):
+    """
+    Displays the progress of recent background DM jobs (final results).
+    """
+    jobs = delivery.get_engine(bot).jobs()
+    lines = ["<b>Recent Deliveries</b>\n"]
+    if not jobs:
+        lines.append("No delivery jobs yet.")
+    for job in jobs:
+        started = datetime.fromtimestamp(job.started, timezone.utc).strftime("%d %b %H:%M:%S")
+        icon = "✅" if job.done else "⏳"
+        report = job.report
+        lines.append(
+            f"{icon} <b>{job.label}</b> (started {started} UTC)\n"
+            f"   {report.total}/{job.total} sent | delivered {report.delivered}, "
+            f"failed {report.failed}, blocked {report.blocked}"
+        )
+    text = "\n".join(lines)
+
+    markup = markup_cache.refresh_back("deliveries", "admin_back")
+    try:
+        bot.edit_message_text(call.message.chat.id, call.message.message_id,
+                              text, parse_mode="HTML", reply_markup=markup)
+    except:
+        # Unchanged progress raises "message is not modified"; nothing to resend.
+        pass
+    try:
+        bot.answer_callback_query(call.id)
+    except:
+        pass
+
+def show_diagnostics(bot, call):
+    """
+    Displays the runtime counters of the live monitor and the bot's other
+    background machinery, one line per component.
+    """
+    lines = ["<b>Diagnostics</b>\n"]
+    monitor = SCHEDULER.status()
+    if monitor["next_wakeup"]:
+        next_poll = datetime.fromtimestamp(monitor["next_wakeup"], timezone.utc).strftime("%d %b %H:%M:%S")
+        lines.append(
+            f"<i>Live monitor: next poll {next_poll} UTC, "
+            f"{monitor['polls']} poll(s) made, {monitor['skipped_polls']} skipped</i>"
+        )
+    live = LIVE_STATE.stats()
+    lines.append(
+        f"<i>Live state: {live['tracked']} tracked, {live['flushes']} flush(es) "
+        f"(avg {live['avg_ms']} ms, max {live['max_ms']} ms), {live['skipped']} unchanged</i>"
+    )
+    burst = COALESCER.stats()
+    lines.append(
+        f"<i>Live updates: {burst['delivered']} sent, {burst['merged']} merged, "
+        f"{burst['suppressed']} suppressed, {burst['pending']} pending</i>"
+    )
+    cards = CARDS.stats()
+    if config_service.settings().get("live_cards", False) or cards["sent"]:
+        lines.append(
+            f"<i>Live cards: {cards['sent']} sent, {cards['edited']} edited, "
+            f"{cards['unchanged']} unchanged, {cards['failed']} failed</i>"
+        )
+    for endpoint, st in sorted(http_client.stats().items()):
+        lines.append(
+            f"<i>API {endpoint}: {st['requests']} req, {st['not_modified']} unchanged, "
+            f"{st['errors']} errors, avg {st['avg_ms']} ms, {st['bytes'] // 1024} KiB</i>"
+        )
+    busiest = [r for r in get_router(bot).stats() if r["hits"]][:5]
+    if busiest:
+        lines.append("<i>Busiest buttons: " + ", ".join(
+            f"{r['action']} {r['hits']}× ({r['avg_ms']} ms)" for r in busiest
+        ) + "</i>")
+    text = "\n".join(lines)
+
+    markup = markup_cache.refresh_back("diagnostics", "admin_back")
+    try:
+        bot.edit_message_text(call.message.chat.id, call.message.message_id,
+                              text, parse_mode="HTML", reply_markup=markup)
+    except:
+        # Unchanged counters raise "message is not modified"; nothing to resend.
+        pass
+    try:
+        bot.answer_callback_query(call.id)
+    except:
+        pass
+
 def show_participants_info(bot, call):
     """
-    Displays the total number of participants (count of .json in users/).
+    Displays the total number of participants (profiles in the user store).
     """
     total_users = get_total_users()
     text = f"👥 <b>Total Participants:</b> {total_users}\n\nYou can expand this to show more info."
-    markup = types.InlineKeyboardMarkup()
-    markup.add(types.InlineKeyboardButton("🔙 Back", callback_data="admin_back"))
+    markup = markup_cache.back_button("admin_back")
     try:
         bot.edit_message_text(call.message.chat.id, call.message.message_id,
                               text, parse_mode="HTML", reply_markup=markup)
@@ -287,35 +299,22 @@ def on_broadcast_callback(bot, call):
 
 def broadcast_to_all(bot, text):
     """
-    Sends the given text to all user_id found in the users/ folder.
-    Returns how many were sent.
+    Sends the given text to every user_id in the user store through the
+    shared delivery engine. Returns the DeliveryReport.
     """
-    if not os.path.exists(USERS_DIR):
-        return 0
-    files = [f for f in os.listdir(USERS_DIR) if f.endswith(".json")]
-    count_sent = 0
-    for filename in files:
-        user_id_str = filename.replace(".json", "")
-        try:
-            user_id = int(user_id_str)
-        except:
-            continue
-        try:
-            bot.send_message(user_id, text, parse_mode="HTML")
-            count_sent += 1
-        except Exception as e:
-            print(f"[broadcast WARNING] Could not send to {user_id}: {e}")
-    return count_sent
+    messages = [(user_id, text, {"parse_mode": "HTML"}) for user_id in user_store.all_user_ids()]
+    report = delivery.get_engine(bot).send_many(messages)
+    print(f"[broadcast] {report}")
+    return report
 
 # ---------------------------
 # Match Setting Helpers
 # ---------------------------
-def handle_set_match_callback(bot, call):
+def handle_set_match_callback(bot, call, fixture_id):
     """
     Called when admin picks a fixture to set from the upcoming list.
     We add it to FixedMatches.json if not already present.
     """
-    fixture_id = call.data.split(":", 1)[1]
     if is_fixture_set(fixture_id):
         try:
             bot.answer_callback_query(call.id, "⚠️ This match has been set already!", show_alert=True)
@@ -323,7 +322,7 @@ def handle_set_match_callback(bot, call):
             pass
         return
 
-    fix = CURRENT_FIXTURES.get(fixture_id)
+    fix = CATALOG.get(fixture_id)
     if not fix:
         try:
             bot.answer_callback_query(call.id, "❌ Fixture data not found.")
@@ -333,13 +332,6 @@ def handle_set_match_callback(bot, call):
 
     try:
         fixture_timestamp = fix["fixture"]["timestamp"]
-        base_timestamp = fixture_timestamp - 30
-        fm_list = load_fixed_matches()
-        new_timestamp = base_timestamp
-        existing_timestamps = {m["timestamp"] for m in fm_list}
-        while new_timestamp in existing_timestamps:
-            new_timestamp += 1
-
         match_entry = {
             "fixture_id": fixture_id,
             "home": {
@@ -350,10 +342,16 @@ def handle_set_match_callback(bot, call):
                 "id": fix["teams"]["away"]["id"],
                 "name": fix["teams"]["away"]["name"]
             },
-            "timestamp": new_timestamp
+            "league": fix["league"]["id"],
+            "timestamp": fixture_timestamp - 30
         }
-        fm_list.append(match_entry)
-        save_fixed_matches(fm_list)
+        # The registry bumps the timestamp if another fixed match already uses it.
+        if not add_fixed_match(match_entry):
+            try:
+                bot.answer_callback_query(call.id, "⚠️ This match has been set already!", show_alert=True)
+            except:
+                pass
+            return
     except:
         try:
             bot.answer_callback_query(call.id, "❌ Error processing fixture data.")
@@ -383,83 +381,89 @@ def handle_set_match_callback(bot, call):
 # Register Admin Handlers
 # ---------------------------
 def register_admin_handlers(bot):
+    CATALOG.start()
+
     @bot.message_handler(commands=["admin"])
     def admin_command_handler(message):
         # Only allow authorized admin users
-        if str(message.from_user.id) not in map(str, config.get("adminids", [])):
+        if not is_admin(message.from_user.id):
             bot.reply_to(message, "🚫 You are not authorized to use this command.")
             return
         show_admin_main_menu(bot, message.chat.id)
 
-    # Only handle callbacks that match admin commands,
-    # so we don't block user callbacks from user_play or other modules.
-    @bot.callback_query_handler(func=lambda call: _is_admin_callback(call.data))
-    def admin_callback_router(call):
-        # Check admin
-        if str(call.from_user.id) not in map(str, config.get("adminids", [])):
+    # Every admin button goes through the shared callback router; admin=True
+    # routes are authorized there, once, before the handler runs.
+    router = get_router(bot)
+    router.admin_check = is_admin
+
+    @router.route("set_match", admin=True)
+    def set_match_callback(call):
+        show_match_selection(bot, call)
+
+    @router.route("setmatch", str, admin=True)
+    def setmatch_callback(call, fixture_id):
+        handle_set_match_callback(bot, call, fixture_id)
+
+    @router.route("remove_match", admin=True)
+    def remove_match_callback(call):
+        show_remove_match_menu(bot, call)
+
+    @router.route("removematch", str, admin=True)
+    def removematch_callback(call, fixture_id):
+        if not remove_fixed_match(fixture_id):
+            # Not found
             try:
-                bot.answer_callback_query(call.id, "🚫 Unauthorized")
+                bot.answer_callback_query(call.id, "⚠️ Match not found!")
             except:
                 pass
             return
+        markup = types.InlineKeyboardMarkup()
+        markup.row(
+            types.InlineKeyboardButton("🗑️ Remove Another", callback_data="remove_match"),
+            types.InlineKeyboardButton("🏠 Main Menu", callback_data="admin_main")
+        )
+        text = "🚮 Match removed successfully!"
+        try:
+            bot.edit_message_text(call.message.chat.id, call.message.message_id,
+                                  text, reply_markup=markup)
+        except:
+            bot.send_message(call.message.chat.id, text, reply_markup=markup)
+        try:
+            bot.answer_callback_query(call.id)
+        except:
+            pass
 
-        data = call.data
-        if data == "set_match":
-            show_match_selection(bot, call)
-        elif data.startswith("setmatch:"):
-            handle_set_match_callback(bot, call)
-        elif data == "remove_match":
-            show_remove_match_menu(bot, call)
-        elif data.startswith("removematch:"):
-            fixture_id = data.split(":", 1)[1]
-            fm_list = load_fixed_matches()
-            new_list = [m for m in fm_list if str(m["fixture_id"]) != fixture_id]
-            if len(new_list) == len(fm_list):
-                # Not found
-                try:
-                    bot.answer_callback_query(call.id, "⚠️ Match not found!")
-                except:
-                    pass
-                return
-            save_fixed_matches(new_list)
-            markup = types.InlineKeyboardMarkup()
-            markup.row(
-                types.InlineKeyboardButton("🗑️ Remove Another", callback_data="remove_match"),
-                types.InlineKeyboardButton("🏠 Main Menu", callback_data="admin_main")
-            )
-            text = "🚮 Match removed successfully!"
-            try:
-                bot.edit_message_text(call.message.chat.id, call.message.message_id,
-                                      text, reply_markup=markup)
-            except:
-                bot.send_message(call.message.chat.id, text, reply_markup=markup)
-            try:
-                bot.answer_callback_query(call.id)
-            except:
-                pass
-        elif data == "fixture":
-            show_fixtures_info(bot, call)
-        elif data == "participants":
-            show_participants_info(bot, call)
-        elif data == "broadcast":
-            on_broadcast_callback(bot, call)
-        elif data == "admin_main":
-            show_admin_main_menu(bot, call.message.chat.id, call.message.message_id)
-            try:
-                bot.answer_callback_query(call.id)
-            except:
-                pass
-        elif data == "admin_back":
-            show_admin_main_menu(bot, call.message.chat.id, call.message.message_id)
-            try:
-                bot.answer_callback_query(call.id)
-            except:
-                pass
-        else:
-            try:
-                bot.answer_callback_query(call.id, "Unrecognized admin action.")
-            except:
-                pass
+    @router.route("fixture", admin=True)
+    def fixture_callback(call):
+        show_fixtures_info(bot, call)
+
+    @router.route("participants", admin=True)
+    def participants_callback(call):
+        show_participants_info(bot, call)
+
+    @router.route("deliveries", admin=True)
+    def deliveries_callback(call):
+        show_delivery_jobs(bot, call)
+
+    @router.route("diagnostics", admin=True)
+    def diagnostics_callback(call):
+        show_diagnostics(bot, call)
+
+    @router.route("broadcast", admin=True)
+    def broadcast_callback(call):
+        on_broadcast_callback(bot, call)
+
+    @router.route("admin_main", admin=True)
+    def admin_main_callback(call):
+        show_admin_main_menu(bot, call.message.chat.id, call.message.message_id)
+        try:
+            bot.answer_callback_query(call.id)
+        except:
+            pass
+
+    @router.route("admin_back", admin=True)
+    def admin_back_callback(call):
+        admin_main_callback(call)
 
     # Handle the broadcast flow
     @bot.message_handler(func=lambda msg: _is_admin_in_broadcast_state(msg))
@@ -468,8 +472,11 @@ def register_admin_handlers(bot):
         broadcast_text = message.text
         # Clear the admin state
         ADMIN_STATES[user_id] = None
-        count_sent = broadcast_to_all(bot, broadcast_text)
-        ack = f"✅ Broadcast delivered to {count_sent} user(s)."
+        report = broadcast_to_all(bot, broadcast_text)
+        ack = (
+            f"✅ Broadcast delivered to {report.delivered} user(s).\n"
+            f"Failed: {report.failed} | Blocked the bot: {report.blocked}"
+        )
         bot.reply_to(message, ack)
         # Return to admin menu
         show_admin_main_menu(bot, message.chat.id)
@@ -482,26 +489,6 @@ def _is_admin_in_broadcast_state(msg):
         return False
     uid = msg.from_user.id
     # Must be in admin list AND in broadcast_wait state
-    if str(uid) not in map(str, config.get("adminids", [])):
+    if not is_admin(uid):
         return False
     return ADMIN_STATES.get(uid) == "broadcast_wait"
-
-def _is_admin_callback(data):
-    """
-    Returns True if the callback data is recognized as an admin action,
-    meaning we should route it in admin_callback_router.
-    Otherwise, user or other modules can handle it.
-    """
-    # Here are the known admin data prefixes/values
-    admin_keys = [
-        "set_match", "remove_match", "admin_main", "admin_back",
-        "fixture", "participants", "broadcast"
-    ]
-    # Also anything that starts with setmatch: or removematch:
-    if data in admin_keys:
-        return True
-    if data.startswith("setmatch:"):
-        return True
-    if data.startswith("removematch:"):
-        return True
-    return False
@@ -1,23 +1,48 @@
 import telebot
-import json
 import time
+import config_service
 from adminhandler import register_admin_handlers
 from userhandler import register_user_handlers
 from user_play import register_user_play_handlers
 from live_monitor import start_live_monitor
 
-# Load configuration from config.json
-with open("config.json", "r") as f:
-    config = json.load(f)
+# Load and validate config.json (see config_service.py)
+config = config_service.settings()
 
-bot = telebot.TeleBot(config["bot_token"])
+# "runtime": "asyncio_bridge" (opt-in) runs Telegram I/O and live polling on
+# one event loop, bridged to the synchronous handlers, which keep running on
+# worker threads (see async_runtime.py); the default is the threaded TeleBot below.
+if config.get("runtime", "threads") in ("asyncio_bridge", "asyncio"):
+    import async_runtime
+    async_runtime.run(config)
+    raise SystemExit(0)
+
+# "ingestion": "webhook" receives updates on an embedded HTTP server (see
+# webhook_server.py); the default is long polling.
+webhook_mode = config.get("ingestion", "polling") == "webhook"
+
+# In webhook mode the server's worker pool runs the handlers itself.
+bot = telebot.TeleBot(config.bot_token, threaded=not webhook_mode)
 
 # Register handlers
 register_admin_handlers(bot)
 register_user_handlers(bot)
-register_user_play_handlers(bot)
+# "stateless_predictions": true carries the half-entered score in the buttons
+# instead of server memory (see user_play.py).
+register_user_play_handlers(bot, stateless=config.get("stateless_predictions", False))
 start_live_monitor(bot)
 
+if webhook_mode:
+    import webhook_server
+    webhook_server.run(bot, config)
+    raise SystemExit(0)
+
+# getUpdates is refused while a webhook is set (e.g. after switching back).
+try:
+    bot.remove_webhook()
+except Exception as e:
+    print("Could not remove webhook:", e)
+
 # Infinite polling loop with error handling
 while True:
     try:
@@ -0,0 +1,102 @@
+"""
+Microbenchmark for inline keyboard construction per callback.
+
+Compares, per tap, the CPU time of building a keyboard the old way (a fresh
+InlineKeyboardMarkup, serialized by telebot when sent) with the cached
+JSON from markup_cache, for the main menu, a score picker and the Play menu.
+
+Usage (from the Footballer folder):
+    python benchmarks/bench_markup.py
+"""
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The bot modules use paths relative to the working directory.
+os.chdir(tempfile.mkdtemp(prefix="bench_markup_"))
+
+from telebot import types
+
+import markup_cache
+from fixed_matches import REGISTRY
+
+FIXTURES = 20
+REPEAT = 5000
+
+def _old_main_menu():
+    markup = types.InlineKeyboardMarkup()
+    btn_play = types.InlineKeyboardButton("🎮 Play", callback_data="user_play")
+    btn_myfixtures = types.InlineKeyboardButton("📋 My Fixtures", callback_data="user_myfixtures")
+    btn_profile = types.InlineKeyboardButton("👤 Profile", callback_data="user_profile")
+    btn_admin = types.InlineKeyboardButton("🔧 Administration", callback_data="user_administration")
+    btn_leaderboard = types.InlineKeyboardButton("🏆 Leaderboard", callback_data="user_leaderboard")
+    btn_faq = types.InlineKeyboardButton("❓ FAQ", callback_data="user_faq")
+    markup.row(btn_play, btn_myfixtures)
+    markup.row(btn_profile, btn_admin)
+    markup.row(btn_leaderboard, btn_faq)
+    return markup.to_json()
+
+def _old_score_picker(fixture_id):
+    markup = types.InlineKeyboardMarkup()
+    row = []
+    for num in range(0, 11):
+        row.append(types.InlineKeyboardButton(str(num), callback_data=f"predict_team1:{num}:{fixture_id}"))
+        if len(row) == 3:
+            markup.row(*row)
+            row = []
+    if row:
+        markup.row(*row)
+    markup.add(types.InlineKeyboardButton("🔙 Back", callback_data="user_play"))
+    return markup.to_json()
+
+def _old_play_menu(matches, predicted):
+    markup = types.InlineKeyboardMarkup()
+    for match in matches:
+        fixture_id = match.get("fixture_id")
+        match_date = datetime.fromtimestamp(match["timestamp"] + 30, timezone.utc).strftime("%d %b")
+        button_text = f"📆 {match_date}: {match['home']['name']} vs {match['away']['name']}"
+        if str(fixture_id) in predicted:
+            button_text += " 🔴"
+        markup.add(types.InlineKeyboardButton(button_text, callback_data=f"play_match:{fixture_id}"))
+    markup.add(types.InlineKeyboardButton("🔙 Back", callback_data="user_main_menu"))
+    return markup.to_json()
+
+def _cpu_us(fn):
+    start = time.process_time()
+    for _ in range(REPEAT):
+        fn()
+    return (time.process_time() - start) / REPEAT * 1e6
+
+def main():
+    for i in range(FIXTURES):
+        REGISTRY.add({
+            "fixture_id": str(1000 + i),
+            "home": {"id": 1, "name": f"Home {i}"},
+            "away": {"id": 2, "name": f"Away {i}"},
+            "timestamp": 1_700_000_000 + i * 3600
+        })
+    matches = REGISTRY.all()
+    predicted = {str(1000 + i) for i in range(0, FIXTURES, 3)}
+
+    # Same keyboards either way
+    assert _old_main_menu() == markup_cache.main_menu()
+    assert _old_score_picker("1000") == markup_cache.score_picker("team1", "1000")
+
+    cases = [
+        ("main menu", _old_main_menu, markup_cache.main_menu),
+        ("score picker", lambda: _old_score_picker("1000"),
+         lambda: markup_cache.score_picker("team1", "1000")),
+        (f"play menu ({FIXTURES})", lambda: _old_play_menu(matches, predicted),
+         lambda: markup_cache.play_menu(matches, predicted)),
+    ]
+    print(f"{'keyboard':<18} {'build us':>9} {'cached us':>10} {'speedup':>8}")
+    for name, old, new in cases:
+        old_us = _cpu_us(old)
+        new_us = _cpu_us(new)
+        print(f"{name:<18} {old_us:>9.2f} {new_us:>10.2f} {old_us / new_us:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
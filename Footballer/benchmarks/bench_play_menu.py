@@ -0,0 +1,91 @@
+"""
+Microbenchmark for the Play menu render (user_play.show_play_menu).
+
+Renders the menu against a throw-away database for a grid of open fixtures x
+per-user prediction history, and compares the batched "already predicted"
+lookup with the old one-lookup-per-fixture loop.
+
+Usage (from the Footballer folder):
+    python benchmarks/bench_play_menu.py
+"""
+import os
+import sys
+import time
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The bot modules use paths relative to the working directory.
+os.chdir(tempfile.mkdtemp(prefix="bench_play_menu_"))
+
+import db
+import user_store
+import user_play
+from fixed_matches import REGISTRY
+from predictions_db import DB_FILE
+
+USER_ID = 42
+FIXTURE_COUNTS = (5, 20, 50)
+HISTORY_SIZES = (0, 100, 1000, 5000)
+REPEAT = 200
+
+class NullBot:
+    def edit_message_text(self, *args, **kwargs):
+        pass
+
+    def send_message(self, *args, **kwargs):
+        pass
+
+    def answer_callback_query(self, *args, **kwargs):
+        pass
+
+def _seed(n_fixtures, history):
+    with db.transaction(DB_FILE) as conn:
+        conn.execute("DELETE FROM predictions")
+        # Settled history on old fixtures, plus every other open fixture predicted.
+        rows = [(1_000_000 + i, USER_ID, 1, 0, "bench", i) for i in range(history)]
+        rows += [(i, USER_ID, 2, 2, "bench", 0) for i in range(0, n_fixtures, 2)]
+        conn.executemany(
+            "INSERT INTO predictions (fixture_id, user_id, home, away, username, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+    for m in REGISTRY.all():
+        REGISTRY.remove(m["fixture_id"])
+    for i in range(n_fixtures):
+        REGISTRY.add({
+            "fixture_id": str(i),
+            "home": {"id": 1, "name": f"Home {i}"},
+            "away": {"id": 2, "name": f"Away {i}"},
+            "timestamp": 1_700_000_000 + i * 3600
+        })
+
+def _per_fixture_lookup(fixed):
+    return {str(m["fixture_id"]) for m in fixed if user_play.has_user_predicted(USER_ID, m["fixture_id"])}
+
+def _time(fn):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+def main():
+    bot = NullBot()
+    call = SimpleNamespace(
+        id="1",
+        from_user=SimpleNamespace(id=USER_ID),
+        message=SimpleNamespace(chat=SimpleNamespace(id=USER_ID), message_id=1)
+    )
+    print(f"{'fixtures':>8} {'history':>8} {'menu ms':>9} {'batched ms':>11} {'per-fixture ms':>15}")
+    for n_fixtures in FIXTURE_COUNTS:
+        for history in HISTORY_SIZES:
+            _seed(n_fixtures, history)
+            fixed = REGISTRY.all()
+            ids = [m["fixture_id"] for m in fixed]
+            menu_ms = _time(lambda: user_play.show_play_menu(bot, call))
+            batched_ms = _time(lambda: user_store.predicted_fixture_ids(USER_ID, ids))
+            loop_ms = _time(lambda: _per_fixture_lookup(fixed))
+            print(f"{n_fixtures:>8} {history:>8} {menu_ms:>9.3f} {batched_ms:>11.3f} {loop_ms:>15.3f}")
+
+if __name__ == "__main__":
+    main()
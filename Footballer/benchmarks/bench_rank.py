@@ -0,0 +1,90 @@
+"""
+Microbenchmark for the Profile rank lookup (stats_db.get_user_stats).
+
+Seeds a throw-away users table and compares, per lookup:
+  - sort:    the old approach (load every row, sort in Python, walk the list)
+  - sql:     COUNT(*) range queries on idx_users_rank
+  - fenwick: the in-memory RankIndex used by get_user_stats
+and checks that all three agree.
+
+Usage (from the Footballer folder):
+    python benchmarks/bench_rank.py
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The bot modules use paths relative to the working directory.
+os.chdir(tempfile.mkdtemp(prefix="bench_rank_"))
+
+import db
+import stats_db
+
+USER_COUNTS = (1_000, 10_000, 100_000)
+LOOKUPS = 50
+
+def _seed(n_users):
+    rng = random.Random(n_users)
+    with db.transaction(stats_db.USER_STATS_DB) as conn:
+        conn.execute("DELETE FROM users")
+        rows = []
+        for uid in range(1, n_users + 1):
+            won, lost = rng.randint(0, 60), rng.randint(0, 60)
+            rows.append((uid, f"user{uid}", won, lost, won * 5))
+        conn.executemany(
+            "INSERT INTO users (user_id, username, won, lost, pts) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+    stats_db.RANKS.loaded = False
+
+def _sort_rank(user_id):
+    conn = db.get_connection(stats_db.USER_STATS_DB)
+    all_rows = conn.execute("SELECT user_id, won, lost, pts FROM users").fetchall()
+    sorted_data = sorted(all_rows, key=lambda x: (-x[3], x[0]))
+    for rank, row in enumerate(sorted_data, start=1):
+        if row[0] == user_id:
+            return (rank, len(sorted_data))
+    return None
+
+def _fenwick_rank(user_id):
+    return stats_db.get_user_stats(user_id)[3:]
+
+def _time(fn, ids):
+    start = time.perf_counter()
+    for uid in ids:
+        fn(uid)
+    return (time.perf_counter() - start) / len(ids) * 1000
+
+def main():
+    print(f"{'users':>8} {'sort ms':>9} {'sql ms':>9} {'fenwick ms':>11} {'index build ms':>15}")
+    for n_users in USER_COUNTS:
+        _seed(n_users)
+        ids = random.Random(0).sample(range(1, n_users + 1), LOOKUPS)
+
+        start = time.perf_counter()
+        stats_db._ensure_rank_index()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        for uid in ids[:10]:
+            expected = _sort_rank(uid)
+            assert stats_db.get_user_rank_sql(uid) == expected, uid
+            assert _fenwick_rank(uid) == expected, uid
+
+        sort_ms = _time(_sort_rank, ids)
+        sql_ms = _time(stats_db.get_user_rank_sql, ids)
+        fenwick_ms = _time(_fenwick_rank, ids)
+        print(f"{n_users:>8} {sort_ms:>9.3f} {sql_ms:>9.3f} {fenwick_ms:>11.4f} {build_ms:>15.1f}")
+
+    # Settlement keeps the index current: points changes are reflected immediately.
+    uid = ids[0]
+    for _ in range(3):
+        stats_db.update_user_stats(uid, "bench", "won")
+    assert _fenwick_rank(uid) == _sort_rank(uid)
+    stats_db.update_user_stats(10 ** 9, "newcomer", "lost")
+    assert _fenwick_rank(10 ** 9) == _sort_rank(10 ** 9)
+
+if __name__ == "__main__":
+    main()
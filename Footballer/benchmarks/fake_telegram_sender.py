@@ -0,0 +1,101 @@
+"""
+Fake Telegram sender for trying webhook mode locally.
+
+POSTs synthetic updates (/start messages and Play-menu callbacks) to the
+webhook server the way Telegram does, from several concurrent connections,
+and reports how many were accepted, pushed back with 503 (queue full) or
+failed, plus request latency.
+
+Usage (bot running with "ingestion": "webhook" and no "url"):
+    python benchmarks/fake_telegram_sender.py --url http://127.0.0.1:8443/bot \\
+        --secret <secret_token> --updates 500 --concurrency 20
+"""
+import sys
+import json
+import time
+import argparse
+import itertools
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+_update_ids = itertools.count(1)
+
+def _user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": f"Fake{user_id}", "username": f"fake{user_id}"}
+
+def make_update(n, users):
+    user_id = 10_000 + n % users
+    chat = {"id": user_id, "type": "private"}
+    update = {"update_id": next(_update_ids)}
+    if n % 2 == 0:
+        update["message"] = {
+            "message_id": n, "date": int(time.time()), "chat": chat,
+            "from": _user(user_id), "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        }
+    else:
+        update["callback_query"] = {
+            "id": str(n), "from": _user(user_id), "chat_instance": "fake",
+            "data": "user_play",
+            "message": {"message_id": n, "date": int(time.time()), "chat": chat, "text": "menu"},
+        }
+    return update
+
+def post(url, secret, update):
+    req = urllib.request.Request(
+        url, data=json.dumps(update).encode(), method="POST",
+        headers={"Content-Type": "application/json"}
+    )
+    if secret:
+        req.add_header("X-Telegram-Bot-Api-Secret-Token", secret)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = None
+    return status, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8443/bot")
+    parser.add_argument("--secret", default=None)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    counts = {}
+    latencies = []
+    lock = threading.Lock()
+
+    def send(n):
+        status, latency = post(args.url, args.secret, make_update(n, args.users))
+        with lock:
+            counts[status] = counts.get(status, 0) + 1
+            latencies.append(latency)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(send, range(args.updates)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"sent {args.updates} updates in {elapsed:.2f}s ({args.updates / elapsed:.0f}/s)")
+    print(f"accepted (200): {counts.get(200, 0)}  backpressure (503): {counts.get(503, 0)}  "
+          f"other: { {k: v for k, v in counts.items() if k not in (200, 503)} }")
+    print(f"latency p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+    try:
+        with urllib.request.urlopen(args.url + "/health", timeout=5) as resp:
+            print("server:", json.loads(resp.read()))
+    except Exception:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
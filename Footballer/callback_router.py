@@ -0,0 +1,133 @@
+import time
+import threading
+
+# -----------------------------------------------------------------------------
+# Callback query router
+# -----------------------------------------------------------------------------
+# One callback_query_handler per bot instead of one filter lambda per
+# button type. Callback data is parsed once as "action:arg1:arg2", the action
+# is looked up in a dict, the arguments are converted by the route's types,
+# and admin-only routes are authorized before the handler runs. Each route
+# counts hits, errors, denials and handler latency for the admin panel.
+#
+#     router = get_router(bot)
+#
+#     @router.route("play_match", str)
+#     def play_match_callback(call, fixture_id): ...
+
+class Route:
+    __slots__ = ("action", "handler", "converters", "optional", "admin",
+                 "hits", "errors", "denied", "latency_total", "latency_max")
+
+    def __init__(self, action, handler, converters, optional, admin):
+        self.action = action
+        self.handler = handler
+        self.converters = converters
+        self.optional = optional
+        self.admin = admin
+        self.hits = 0
+        self.errors = 0
+        self.denied = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def as_dict(self):
+        return {
+            "action": self.action,
+            "hits": self.hits,
+            "errors": self.errors,
+            "denied": self.denied,
+            "avg_ms": round(self.latency_total / self.hits * 1000, 1) if self.hits else 0.0,
+            "max_ms": round(self.latency_max * 1000, 1),
+        }
+
+class CallbackRouter:
+    def __init__(self, bot):
+        self.bot = bot
+        self.routes = {}
+        self.admin_check = None   # callable(user_id) -> bool, set by adminhandler
+        self.unrouted = 0
+        self.invalid = 0
+        self._lock = threading.Lock()
+
+    def route(self, action, *converters, optional=0, admin=False):
+        """
+        Register `handler(call, *args)` for callback data "action[:arg...]".
+        `converters` (e.g. int, str) type each argument; the argument count
+        must match, except that the last `optional` arguments may be left
+        out. admin=True routes are refused unless admin_check passes.
+        """
+        def decorator(handler):
+            if action in self.routes:
+                raise ValueError(f"Callback route {action!r} is already registered")
+            self.routes[action] = Route(action, handler, converters, optional, admin)
+            return handler
+        return decorator
+
+    def _answer(self, call, text=None):
+        try:
+            self.bot.answer_callback_query(call.id, text)
+        except:
+            pass
+
+    def dispatch(self, call):
+        action, _, rest = (call.data or "").partition(":")
+        route = self.routes.get(action)
+        if route is None:
+            with self._lock:
+                self.unrouted += 1
+            self._answer(call)
+            return
+
+        raw_args = rest.split(":") if rest else []
+        try:
+            if not len(route.converters) - route.optional <= len(raw_args) <= len(route.converters):
+                raise ValueError(call.data)
+            args = [conv(arg) for conv, arg in zip(route.converters, raw_args)]
+        except ValueError:
+            with self._lock:
+                self.invalid += 1
+            self._answer(call, "❌ Invalid callback data!")
+            return
+
+        if route.admin and not (self.admin_check and self.admin_check(call.from_user.id)):
+            with self._lock:
+                route.denied += 1
+            self._answer(call, "🚫 Unauthorized")
+            return
+
+        start = time.perf_counter()
+        try:
+            route.handler(call, *args)
+        except Exception:
+            with self._lock:
+                route.errors += 1
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            with self._lock:
+                route.hits += 1
+                route.latency_total += latency
+                route.latency_max = max(route.latency_max, latency)
+
+    def stats(self):
+        """Per-route counters, busiest first."""
+        with self._lock:
+            rows = [r.as_dict() for r in self.routes.values()]
+        rows.sort(key=lambda r: r["hits"], reverse=True)
+        return rows
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+def get_router(bot):
+    """
+    Return the bot's router, installing its single callback_query_handler
+    on first use.
+    """
+    with _routers_lock:
+        router = _routers.get(id(bot))
+        if router is None:
+            router = _routers[id(bot)] = CallbackRouter(bot)
+            bot.callback_query_handler(func=lambda call: True)(router.dispatch)
+        return router
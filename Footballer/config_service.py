@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import threading
+
+# -----------------------------------------------------------------------------
+# Configuration service
+# -----------------------------------------------------------------------------
+# config.json is parsed and validated once into a Settings snapshot with
+# typed, pre-normalized values (admin ids as a frozenset of ints, so admin
+# checks are a set lookup). The file's mtime is checked at most every
+# RELOAD_CHECK_INTERVAL seconds and a changed file is reloaded; a reload that
+# fails validation keeps the previous settings. bot_token is only read at
+# startup, every other value takes effect on the next use.
+#
+# config example:
+# {
+#   "bot_token": "...",
+#   "adminids": [123456789],
+#   "groupid": -1001234567890,   (optional, group score/final posts)
+#   "apikey": "...",
+#   "tocheck": 10,               (optional, live poll interval in seconds)
+#   "league": 39,                (optional, fixture catalog)
+#   "leagues": [39, 40, 140],    (optional, several leagues; overrides "league")
+#   "season": 2024               (optional, fixture catalog)
+#   "live_cards": true           (optional, edit one live score message per chat)
+#   "live_coalesce_window": 20   (optional, seconds to merge score changes per fixture; default 0, off)
+# }
+
+CONFIG_FILE = "config.json"
+RELOAD_CHECK_INTERVAL = 2.0   # seconds between mtime checks
+DEFAULT_TOCHECK = 10
+
+class ConfigError(ValueError):
+    pass
+
+class Settings:
+    __slots__ = ("raw", "bot_token", "admin_ids", "group_id", "apikey", "tocheck")
+
+    def __init__(self, raw):
+        if not isinstance(raw, dict):
+            raise ConfigError("config must be a JSON object")
+        self.raw = raw
+
+        self.bot_token = raw.get("bot_token")
+        if not isinstance(self.bot_token, str) or not self.bot_token:
+            raise ConfigError("bot_token must be a non-empty string")
+
+        admin_ids = raw.get("adminids")
+        if not isinstance(admin_ids, list):
+            raise ConfigError("adminids must be a list of user ids")
+        self.admin_ids = frozenset(_to_int("adminids", uid) for uid in admin_ids)
+
+        group_id = raw.get("groupid")
+        self.group_id = _to_int("groupid", group_id) if group_id not in (None, "") else None
+
+        self.apikey = raw.get("apikey", "")
+        if not isinstance(self.apikey, str):
+            raise ConfigError("apikey must be a string")
+
+        tocheck = raw.get("tocheck", DEFAULT_TOCHECK)
+        if isinstance(tocheck, bool) or not isinstance(tocheck, (int, float)) or tocheck <= 0:
+            raise ConfigError("tocheck must be a positive number of seconds")
+        self.tocheck = tocheck
+
+    def get(self, key, default=None):
+        """Optional keys (runtime, ingestion, webhook, league, ...) as written in the file."""
+        return self.raw.get(key, default)
+
+def _to_int(key, value):
+    if isinstance(value, bool):
+        raise ConfigError(f"{key}: {value!r} is not a Telegram id")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"{key}: {value!r} is not a Telegram id")
+
+class ConfigService:
+    def __init__(self, path=CONFIG_FILE, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.reload_errors = 0
+        self._settings = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _read(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, "r") as f:
+            return Settings(json.load(f)), mtime
+
+    def settings(self):
+        """The current Settings, reloading config.json if it changed on disk."""
+        settings = self._settings
+        if settings is not None and time.monotonic() < self._next_check:
+            return settings
+        with self._lock:
+            if self._settings is None:
+                # First load: a missing or invalid config is fatal
+                self._settings, self._mtime = self._read()
+            elif time.monotonic() >= self._next_check:
+                self._reload_if_changed_locked()
+            self._next_check = time.monotonic() + self.check_interval
+            return self._settings
+
+    def _reload_if_changed_locked(self):
+        try:
+            if os.stat(self.path).st_mtime_ns == self._mtime:
+                return
+            self._settings, self._mtime = self._read()
+            self.reloads += 1
+            print(f"[config] Reloaded {self.path}")
+        except (OSError, ValueError) as e:
+            # Keep serving the last good settings; retry when the file changes again
+            try:
+                self._mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                pass
+            self.reload_errors += 1
+            print(f"[config WARNING] Keeping previous settings, {self.path} is invalid: {e}")
+
+CONFIG = ConfigService()
+
+def settings():
+    return CONFIG.settings()
+
+def is_admin(user_id):
+    try:
+        return int(user_id) in CONFIG.settings().admin_ids
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# -----------------------------------------------------------------------------
+# Shared SQLite connection manager
+# -----------------------------------------------------------------------------
+# Each thread (telebot workers, the live monitor, ...) gets its own long-lived
+# connection per database file. Connections run in WAL mode so readers never
+# block the writer, and wait on a busy timeout instead of failing with
+# "database is locked". sqlite3 keeps a per-connection cache of prepared
+# statements keyed by SQL text, so reusing the connection also reuses them.
+
+BUSY_TIMEOUT_MS = 10000
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_all_connections = []
+_all_lock = threading.Lock()
+
+def _open(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+def get_connection(path):
+    """
+    Return this thread's connection to the database at `path`, opening it
+    on first use.
+    """
+    conns = getattr(_local, "connections", None)
+    if conns is None:
+        conns = _local.connections = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = _open(path)
+        with _all_lock:
+            _all_connections.append(conn)
+    return conn
+
+@contextmanager
+def transaction(path):
+    """
+    Run a block inside one transaction on this thread's connection.
+    Commits on success, rolls back on error.
+
+        with db.transaction(DB_FILE) as conn:
+            conn.execute(...)
+    """
+    conn = get_connection(path)
+    with conn:
+        yield conn
+
+def close_thread_connections():
+    """Close the connections opened by the calling thread."""
+    conns = getattr(_local, "connections", None) or {}
+    with _all_lock:
+        for conn in conns.values():
+            if conn in _all_connections:
+                _all_connections.remove(conn)
+            conn.close()
+    conns.clear()
+
+def close_all():
+    """Close every connection opened by any thread (call at shutdown only)."""
+    with _all_lock:
+        for conn in _all_connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        _all_connections.clear()
@@ -0,0 +1,344 @@
+import time
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from telebot.apihelper import ApiTelegramException
+
+# -----------------------------------------------------------------------------
+# Rate-limited Telegram delivery engine
+# -----------------------------------------------------------------------------
+# Telegram allows roughly 30 messages/second per bot, 1 message/second per
+# private chat and 20 messages/minute per group. Every fan-out (live updates,
+# final results, admin broadcasts) goes through one shared engine so the
+# limits hold across all of them at once.
+
+WORKERS = 8
+GLOBAL_RATE = 25            # messages per second, all chats together
+PRIVATE_CHAT_RATE = 1.0     # messages per second, per private chat
+GROUP_CHAT_RATE = 20 / 60   # messages per second, per group chat
+MAX_ATTEMPTS = 4            # first try + retries after 429 / network errors
+MAX_CHAT_BUCKETS = 50000    # idle per-chat buckets are pruned beyond this
+JOB_IN_FLIGHT = WORKERS     # messages a background job keeps queued at once
+JOB_HISTORY = 20            # finished jobs kept for the admin panel
+
+DELIVERED = "delivered"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a token is available."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self):
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                wait = self._wait_time()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next `seconds` (used for retry_after)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+class DeliveryReport:
+    """Outcome counts of one fan-out."""
+
+    __slots__ = ("delivered", "failed", "blocked", "elapsed")
+
+    def __init__(self):
+        self.delivered = 0
+        self.failed = 0
+        self.blocked = 0
+        self.elapsed = 0.0
+
+    def add(self, outcome):
+        if outcome == DELIVERED:
+            self.delivered += 1
+        elif outcome == BLOCKED:
+            self.blocked += 1
+        else:
+            self.failed += 1
+
+    @property
+    def total(self):
+        return self.delivered + self.failed + self.blocked
+
+    def __str__(self):
+        return (f"delivered={self.delivered} failed={self.failed} "
+                f"blocked={self.blocked} in {self.elapsed:.1f}s")
+
+class DeliveryJob:
+    """
+    Progress of a background fan-out started with DeliveryEngine.submit().
+    Read by the admin panel while the job runs.
+    """
+
+    def __init__(self, job_id, label, total):
+        self.id = job_id
+        self.label = label
+        self.total = total
+        self.report = DeliveryReport()
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _add(self, outcome):
+        with self._lock:
+            self.report.add(outcome)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job has finished (or `timeout` seconds pass)."""
+        return self._done.wait(timeout)
+
+    def __str__(self):
+        with self._lock:
+            sent = self.report.total
+            counts = (f"delivered={self.report.delivered} failed={self.report.failed} "
+                      f"blocked={self.report.blocked}")
+        end = self.finished or time.time()
+        state = "done" if self.done else "running"
+        return (f"#{self.id} {self.label}: {sent}/{self.total} {state}, "
+                f"{counts} in {end - self.started:.1f}s")
+
+class DeliveryEngine:
+    """
+    Sends messages through a worker pool while enforcing a global token
+    bucket and one token bucket per chat. A 429 answer pauses the global
+    bucket for `retry_after` seconds and the message is retried; users who
+    blocked the bot (403) are counted separately and never retried.
+    """
+
+    def __init__(self, bot, workers=WORKERS, global_rate=GLOBAL_RATE):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = {}
+        self._chat_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="delivery")
+        self._job_ids = itertools.count(1)
+        self._jobs = deque(maxlen=JOB_HISTORY)
+        self._jobs_lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id):
+        with self._chat_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                    self._prune_chat_buckets()
+                rate = GROUP_CHAT_RATE if int(chat_id) < 0 else PRIVATE_CHAT_RATE
+                bucket = self._chat_buckets[chat_id] = TokenBucket(rate, capacity=1)
+            return bucket
+
+    def _prune_chat_buckets(self):
+        # A bucket that has refilled completely carries no state worth keeping.
+        now = time.monotonic()
+        idle = [cid for cid, b in self._chat_buckets.items()
+                if now - b.updated > b.capacity / b.rate and now >= b.paused_until]
+        for cid in idle:
+            del self._chat_buckets[cid]
+
+    def _call(self, chat_id, request, idempotent=False):
+        """
+        Run `request()` (one Bot API call to `chat_id`) under the chat's and
+        the global rate limits, retrying 429s and connection errors. Other
+        network errors (a read timeout in particular) may come after Telegram
+        already acted on the request, so they are only retried for
+        `idempotent` calls such as edits. Returns (outcome, result): the
+        call's return value when DELIVERED, otherwise the last error.
+        """
+        chat_bucket = self._chat_bucket(chat_id)
+        error = None
+        for attempt in range(MAX_ATTEMPTS):
+            chat_bucket.acquire()
+            self.global_bucket.acquire()
+            try:
+                return DELIVERED, request()
+            except ApiTelegramException as e:
+                if e.error_code == 429:
+                    params = (e.result_json or {}).get("parameters") or {}
+                    retry_after = params.get("retry_after", 1 + attempt)
+                    self.global_bucket.pause(retry_after)
+                    error = e
+                    continue
+                if e.error_code == 403:
+                    return BLOCKED, e
+                return FAILED, e
+            except Exception as e:
+                if not idempotent and not isinstance(e, requests.exceptions.ConnectionError):
+                    # Possibly delivered already: a retry could send it twice.
+                    print(f"[delivery WARNING] Error sending to {chat_id}, not retried: {e}")
+                    return FAILED, e
+                # Network hiccup: back off a little and try again.
+                print(f"[delivery WARNING] Error sending to {chat_id} (attempt {attempt + 1}): {e}")
+                error = e
+                time.sleep(2 ** attempt)
+        return FAILED, error
+
+    def deliver(self, chat_id, text, **kwargs):
+        """
+        Send one message, blocking until it is delivered or given up on.
+        Returns DELIVERED, FAILED or BLOCKED.
+        """
+        outcome, result = self._call(chat_id, lambda: self.bot.send_message(chat_id, text, **kwargs))
+        if outcome == FAILED and isinstance(result, ApiTelegramException) and result.error_code != 429:
+            print(f"[delivery WARNING] Could not send to {chat_id}: {result}")
+        return outcome
+
+    def deliver_card(self, chat_id, text, message_id=None, **kwargs):
+        """
+        Show `text` in the chat's card: edit message `message_id` in place,
+        or send a new message if there is none (or it can no longer be
+        edited). Returns (outcome, message_id of the card).
+        """
+        if message_id is not None:
+            outcome, result = self._call(
+                chat_id, lambda: self.bot.edit_message_text(text, chat_id, message_id, **kwargs),
+                idempotent=True
+            )
+            if outcome != FAILED or not isinstance(result, ApiTelegramException) or result.error_code != 400:
+                return outcome, message_id
+            if "not modified" in (result.description or ""):
+                return DELIVERED, message_id
+            # Deleted, or too old to edit: fall through and post a fresh card
+        outcome, result = self._call(chat_id, lambda: self.bot.send_message(chat_id, text, **kwargs))
+        if outcome == DELIVERED:
+            return outcome, result.message_id
+        if outcome == FAILED:
+            print(f"[delivery WARNING] Could not send card to {chat_id}: {result}")
+        return outcome, None
+
+    def send_many(self, messages):
+        """
+        Deliver `messages`, an iterable of (chat_id, text, kwargs) tuples,
+        through the worker pool. Blocks until all are done and returns a
+        DeliveryReport.
+        """
+        report = DeliveryReport()
+        start = time.monotonic()
+        futures = [self._pool.submit(self.deliver, chat_id, text, **kwargs)
+                   for (chat_id, text, kwargs) in messages]
+        for fut in futures:
+            try:
+                report.add(fut.result())
+            except Exception as e:
+                print(f"[delivery WARNING] Delivery worker failed: {e}")
+                report.add(FAILED)
+        report.elapsed = time.monotonic() - start
+        return report
+
+    def send_cards(self, cards):
+        """
+        Like send_many for cards: `cards` is an iterable of
+        (chat_id, text, message_id or None, kwargs). Blocks until all are
+        done and returns (DeliveryReport, {chat_id: (outcome, card message_id)}).
+        """
+        report = DeliveryReport()
+        results = {}
+        start = time.monotonic()
+        futures = [(chat_id, self._pool.submit(self.deliver_card, chat_id, text, message_id, **kwargs))
+                   for (chat_id, text, message_id, kwargs) in cards]
+        for chat_id, fut in futures:
+            try:
+                results[chat_id] = fut.result()
+            except Exception as e:
+                print(f"[delivery WARNING] Delivery worker failed: {e}")
+                results[chat_id] = (FAILED, None)
+            report.add(results[chat_id][0])
+        report.elapsed = time.monotonic() - start
+        return report, results
+
+    def submit(self, messages, label, on_done=None, on_result=None):
+        """
+        Start delivering `messages` ((chat_id, text, kwargs) tuples) in the
+        background and return a DeliveryJob right away. The job keeps at most
+        JOB_IN_FLIGHT messages queued on the worker pool, so other fan-outs
+        (live updates, the group) interleave with it instead of waiting for
+        it to drain. `on_result(chat_id, outcome)` is called as each message
+        completes and `on_done(job)` once everything is sent.
+        """
+        messages = list(messages)
+        job = DeliveryJob(next(self._job_ids), label, len(messages))
+        with self._jobs_lock:
+            self._jobs.append(job)
+        threading.Thread(
+            target=self._run_job, args=(job, messages, on_done, on_result),
+            name=f"delivery-job-{job.id}", daemon=True
+        ).start()
+        return job
+
+    def _run_job(self, job, messages, on_done, on_result):
+        slots = threading.Semaphore(JOB_IN_FLIGHT)
+
+        def finished(chat_id, fut):
+            try:
+                outcome = fut.result()
+            except Exception as e:
+                print(f"[delivery WARNING] Delivery worker failed: {e}")
+                outcome = FAILED
+            job._add(outcome)
+            if on_result:
+                try:
+                    on_result(chat_id, outcome)
+                except Exception as e:
+                    print(f"[delivery WARNING] on_result for job #{job.id} failed: {e}")
+            slots.release()
+
+        for (chat_id, text, kwargs) in messages:
+            slots.acquire()
+            fut = self._pool.submit(self.deliver, chat_id, text, **kwargs)
+            fut.add_done_callback(lambda f, chat_id=chat_id: finished(chat_id, f))
+        # Every slot back means every outcome has been recorded.
+        for _ in range(JOB_IN_FLIGHT):
+            slots.acquire()
+        job.finished = time.time()
+        job.report.elapsed = job.finished - job.started
+        job._done.set()
+        if on_done:
+            try:
+                on_done(job)
+            except Exception as e:
+                print(f"[delivery WARNING] on_done for job #{job.id} failed: {e}")
+
+    def jobs(self):
+        """Recent background jobs, newest first."""
+        with self._jobs_lock:
+            return list(reversed(self._jobs))
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(bot):
+    """Return the shared DeliveryEngine for this bot, creating it on first use."""
+    with _engines_lock:
+        engine = _engines.get(id(bot))
+        if engine is None:
+            engine = _engines[id(bot)] = DeliveryEngine(bot)
+        return engine
@@ -0,0 +1,162 @@
+import os
+import json
+import threading
+
+# Fixed matches set by admins.
+FIXED_MATCHES_FILE = "FixedMatches.json"
+
+class FixtureRegistry:
+    """
+    Process-wide, in-memory view of FixedMatches.json.
+
+    The file is parsed once and kept as a list (admin order) plus a dict keyed
+    by str(fixture_id). Every read does a single stat() and only re-parses the
+    file when its mtime changed, so edits made by hand are still picked up.
+    Writes go through the registry and replace the file atomically, so readers
+    never see a half-written list.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._matches = []
+        self._index = {}
+        self._leagues = frozenset()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Call `callback()` after every change: writes made through the
+        registry, and edits to the file picked up on reload.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[fixed_matches WARNING] Listener failed: {e}")
+
+    # ---------------------------
+    # Loading
+    # ---------------------------
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        matches = []
+        if mtime is not None:
+            try:
+                with open(self.path, "r") as f:
+                    matches = json.load(f)
+            except Exception as e:
+                # Keep serving the last good copy rather than an empty list.
+                print(f"[fixed_matches WARNING] Could not read {self.path}: {e}")
+                return
+        first_load = self._mtime is None and not self._matches
+        self._set(matches, mtime)
+        if not first_load:
+            self._notify()
+
+    def _set(self, matches, mtime):
+        self._matches = matches
+        self._index = {str(m["fixture_id"]): m for m in matches}
+        # None for entries saved before the league was stored
+        self._leagues = frozenset(m.get("league") for m in matches)
+        self._mtime = mtime
+
+    def _save(self, matches):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(matches, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._set(matches, os.stat(self.path).st_mtime_ns)
+        self._notify()
+
+    # ---------------------------
+    # Reads
+    # ---------------------------
+    def all(self):
+        """Return a copy of the list of fixed matches."""
+        with self._lock:
+            self._refresh()
+            return list(self._matches)
+
+    def get(self, fixture_id):
+        """Return the fixed match for fixture_id, or None."""
+        with self._lock:
+            self._refresh()
+            return self._index.get(str(fixture_id))
+
+    def contains(self, fixture_id):
+        with self._lock:
+            self._refresh()
+            return str(fixture_id) in self._index
+
+    def ids(self):
+        """Return the set of fixed fixture_ids (as strings)."""
+        with self._lock:
+            self._refresh()
+            return set(self._index)
+
+    def leagues(self):
+        """Return the set of league ids of the fixed matches (None: not recorded)."""
+        with self._lock:
+            self._refresh()
+            return self._leagues
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    def add(self, entry):
+        """
+        Append a match entry. Its timestamp is bumped by a second until no
+        other fixed match shares it. Returns False if the fixture is already set.
+        """
+        with self._lock:
+            self._refresh()
+            if str(entry["fixture_id"]) in self._index:
+                return False
+            existing_timestamps = {m["timestamp"] for m in self._matches}
+            while entry["timestamp"] in existing_timestamps:
+                entry["timestamp"] += 1
+            self._save(self._matches + [entry])
+            return True
+
+    def remove(self, fixture_id):
+        """Remove a match by fixture_id. Returns False if it wasn't set."""
+        with self._lock:
+            self._refresh()
+            if str(fixture_id) not in self._index:
+                return False
+            self._save([m for m in self._matches if str(m["fixture_id"]) != str(fixture_id)])
+            return True
+
+REGISTRY = FixtureRegistry(FIXED_MATCHES_FILE)
+
+# ---------------------------
+# Module-level shortcuts
+# ---------------------------
+def load_fixed_matches():
+    """Return the list of fixed matches (a copy; safe to sort)."""
+    return REGISTRY.all()
+
+def get_fixed_match(fixture_id):
+    """Find a fixed match by its fixture_id, or None."""
+    return REGISTRY.get(fixture_id)
+
+def is_fixture_set(fixture_id):
+    return REGISTRY.contains(fixture_id)
+
+def add_fixed_match(entry):
+    return REGISTRY.add(entry)
+
+def remove_fixed_match(fixture_id):
+    return REGISTRY.remove(fixture_id)
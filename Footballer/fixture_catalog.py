@@ -0,0 +1,142 @@
+import time
+import bisect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+import http_client
+import config_service
+
+# -----------------------------------------------------------------------------
+# Upcoming-fixture catalog for the admin Set Match screen
+# -----------------------------------------------------------------------------
+# Keeps the next WINDOW_DAYS of not-started fixtures in memory, refreshed in
+# the background every `ttl` seconds. The API is asked for just that date
+# range (`from`/`to`), each kickoff is parsed once on refresh, and the list
+# is kept sorted, so the admin screen renders without touching the network.
+# Several leagues are fetched concurrently (at most FETCH_WORKERS at a time)
+# and merged into one list; a refresh only succeeds if every league loaded.
+# apikey, leagues ("leagues", or "league") and season are read from
+# config_service on every refresh, so config.json edits apply to the next one.
+
+FIXTURES_URL = "https://v3.football.api-sports.io/fixtures"
+DEFAULT_LEAGUE = 39      # Premier League
+DEFAULT_SEASON = 2024
+CATALOG_TTL = 10 * 60    # seconds between background refreshes
+WINDOW_DAYS = 20
+RETRY_DELAY = 60         # seconds before retrying a failed refresh
+FETCH_WORKERS = 4        # leagues fetched at once
+
+def _parse_kickoff(date_str):
+    try:
+        return datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+    except:
+        return None
+
+class FixtureCatalog:
+    def __init__(self, ttl=CATALOG_TTL):
+        self.ttl = ttl
+        self.refreshed_at = None   # epoch seconds of the last successful refresh
+        self.last_error = None
+        self._kickoffs = []        # sorted kickoff datetimes, parallel to _fixtures
+        self._fixtures = []
+        self._by_id = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+
+    # ---------------------------
+    # Refresh
+    # ---------------------------
+    def refresh(self):
+        """Fetch the next WINDOW_DAYS of fixtures and swap them in. Returns True on success."""
+        # One refresh at a time; a concurrent caller just uses the current data.
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            today = datetime.now(timezone.utc).date()
+            conf = config_service.settings()
+            leagues = self.leagues
+            season = conf.get("season", DEFAULT_SEASON)
+            try:
+                with ThreadPoolExecutor(max_workers=max(1, min(FETCH_WORKERS, len(leagues)))) as pool:
+                    results = list(pool.map(
+                        lambda league: self._fetch(conf.apikey, league, season, today), leagues
+                    ))
+                items = [fix for league_items in results for fix in league_items]
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[fixture_catalog WARNING] Refresh failed: {e}")
+                return False
+
+            parsed = []
+            for fix in items:
+                kickoff = _parse_kickoff(fix["fixture"]["date"])
+                if kickoff is not None:
+                    parsed.append((kickoff, fix))
+            parsed.sort(key=lambda p: p[0])
+            with self._lock:
+                self._kickoffs = [p[0] for p in parsed]
+                self._fixtures = [p[1] for p in parsed]
+                self._by_id = {str(f["fixture"]["id"]): f for f in self._fixtures}
+            self.refreshed_at = time.time()
+            self.last_error = None
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    @property
+    def leagues(self):
+        """The configured league ids."""
+        conf = config_service.settings()
+        return list(conf.get("leagues") or [conf.get("league", DEFAULT_LEAGUE)])
+
+    def _fetch(self, apikey, league, season, today):
+        params = {
+            "league": league,
+            "season": season,
+            "status": "NS",
+            "from": today.isoformat(),
+            "to": (today + timedelta(days=WINDOW_DAYS)).isoformat(),
+        }
+        headers = {"x-apisports-key": apikey}
+        data, _ = http_client.get_json(FIXTURES_URL, params=params, headers=headers,
+                                       endpoint="fixtures", conditional=True)
+        return (data or {}).get("response", [])
+
+    def start(self):
+        """Start the background refresh thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            ok = self.refresh()
+            time.sleep(self.ttl if ok else RETRY_DELAY)
+
+    # ---------------------------
+    # Reads (memory only, except the very first one)
+    # ---------------------------
+    def upcoming(self, now=None):
+        """
+        Return [(kickoff datetime, fixture)] for fixtures between now and
+        now + WINDOW_DAYS, soonest first.
+        """
+        if self.refreshed_at is None:
+            # Nothing loaded yet (first tap right after startup): wait for the
+            # in-flight background refresh, or run one.
+            with self._refresh_lock:
+                pass
+            if self.refreshed_at is None:
+                self.refresh()
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            lo = bisect.bisect_left(self._kickoffs, now)
+            hi = bisect.bisect_right(self._kickoffs, now + timedelta(days=WINDOW_DAYS))
+            return list(zip(self._kickoffs[lo:hi], self._fixtures[lo:hi]))
+
+    def get(self, fixture_id):
+        """Return the raw API fixture by id, or None."""
+        with self._lock:
+            return self._by_id.get(str(fixture_id))
@@ -0,0 +1,150 @@
+import time
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# -----------------------------------------------------------------------------
+# Shared HTTP client for the football APIs
+# -----------------------------------------------------------------------------
+# One keep-alive session (no TCP/TLS handshake per call), connect/read
+# timeouts so a hung upstream can't freeze the caller, gzip, and
+# ETag / Last-Modified revalidation: an unchanged payload comes back as a
+# bodyless 304 and the cached JSON is reused. Per-endpoint counters for
+# latency and bytes are kept for the admin screens.
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+POOL_SIZE = 10
+
+class EndpointStats:
+    __slots__ = ("requests", "errors", "not_modified", "bytes", "latency_total", "latency_max")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def as_dict(self):
+        ok = self.requests - self.errors
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "not_modified": self.not_modified,
+            "bytes": self.bytes,
+            "avg_ms": round(self.latency_total / ok * 1000, 1) if ok else 0.0,
+            "max_ms": round(self.latency_max * 1000, 1),
+        }
+
+class HttpClient:
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_SIZE,
+            pool_maxsize=POOL_SIZE,
+            # Retry only failed connects; a read timeout is surfaced to the caller.
+            max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.5)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+        self._validators = {}   # cache key -> (etag, last_modified, data)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    # ---------------------------
+    # Conditional-request bookkeeping (also used by the asyncio runtime)
+    # ---------------------------
+    def conditional_headers(self, key):
+        """Return If-None-Match / If-Modified-Since headers for a cached response."""
+        with self._lock:
+            cached = self._validators.get(key)
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def remember(self, key, etag, last_modified, data):
+        if etag or last_modified:
+            with self._lock:
+                self._validators[key] = (etag, last_modified, data)
+
+    def cached(self, key):
+        with self._lock:
+            cached = self._validators.get(key)
+        return cached[2] if cached else None
+
+    def record(self, endpoint, latency, nbytes, not_modified=False, error=False):
+        with self._lock:
+            st = self._stats.get(endpoint)
+            if st is None:
+                st = self._stats[endpoint] = EndpointStats()
+            st.requests += 1
+            if error:
+                st.errors += 1
+                return
+            st.bytes += nbytes
+            st.latency_total += latency
+            st.latency_max = max(st.latency_max, latency)
+            if not_modified:
+                st.not_modified += 1
+
+    def stats(self):
+        """Return {endpoint: {...counters...}}."""
+        with self._lock:
+            return {name: st.as_dict() for name, st in self._stats.items()}
+
+    # ---------------------------
+    # Requests
+    # ---------------------------
+    def get_json(self, url, params=None, headers=None, endpoint=None, conditional=False):
+        """
+        GET `url` and decode JSON. Returns (data, changed). With
+        conditional=True an unchanged resource (304) returns the cached data
+        and changed=False. Raises on network errors and timeouts.
+        """
+        endpoint = endpoint or url
+        key = (url, tuple(sorted((params or {}).items())))
+        req_headers = dict(headers or {})
+        if conditional:
+            req_headers.update(self.conditional_headers(key))
+        start = time.monotonic()
+        try:
+            response = self.session.get(
+                url, params=params, headers=req_headers,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            )
+            latency = time.monotonic() - start
+            # Bytes on the wire: Content-Length is the compressed size when gzipped.
+            nbytes = int(response.headers.get("Content-Length") or len(response.content))
+            if conditional and response.status_code == 304:
+                self.record(endpoint, latency, nbytes, not_modified=True)
+                return self.cached(key), False
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            self.record(endpoint, time.monotonic() - start, 0, error=True)
+            raise
+        self.record(endpoint, latency, nbytes)
+        if conditional:
+            self.remember(key, response.headers.get("ETag"), response.headers.get("Last-Modified"), data)
+        return data, True
+
+CLIENT = HttpClient()
+
+def get_json(url, params=None, headers=None, endpoint=None, conditional=False):
+    return CLIENT.get_json(url, params=params, headers=headers, endpoint=endpoint, conditional=conditional)
+
+def stats():
+    return CLIENT.stats()
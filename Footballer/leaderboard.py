@@ -0,0 +1,87 @@
+import html
+import threading
+
+from telebot import types
+
+import stats_db
+
+# -----------------------------------------------------------------------------
+# Leaderboard pages
+# -----------------------------------------------------------------------------
+# Standings only change when match_finished settles a fixture, so the top
+# TOP_N rows are read once per settlement and each rendered page is cached
+# under the settlement version. Repeated views between settlements (match-day
+# traffic from the group and DMs) are served from memory.
+
+TOP_N = 100
+PAGE_SIZE = 10
+CALLBACK_ACTION = "leaderboard"   # callback data "leaderboard:<page>"
+
+_lock = threading.Lock()
+_version = 0        # bumped by bump_version() after each settlement
+_cache = {
+    "version": None,
+    "top": [],      # (user_id, username, won, lost, pts) rows, best first
+    "pages": {},    # page number -> (text, page_count)
+}
+
+def bump_version():
+    """Invalidate the materialized standings (call after a fixture is settled)."""
+    global _version
+    with _lock:
+        _version += 1
+
+def _refresh_locked():
+    if _cache["version"] != _version:
+        _cache["top"] = stats_db.get_top_users(TOP_N)
+        _cache["pages"] = {}
+        _cache["version"] = _version
+
+def get_page(page):
+    """
+    Return (text, page, page_count) for a 1-based page of the top TOP_N.
+    Out-of-range pages are clamped.
+    """
+    with _lock:
+        _refresh_locked()
+        top = _cache["top"]
+        pages = max(1, -(-len(top) // PAGE_SIZE))
+        page = min(max(1, page), pages)
+        cached = _cache["pages"].get(page)
+        if cached is None:
+            cached = _cache["pages"][page] = (_render_page(top, page, pages), pages)
+        return cached[0], page, cached[1]
+
+def _render_page(top, page, pages):
+    lines = [f"🏆 <b>Leaderboard</b> (page {page}/{pages})\n"]
+    if not top:
+        lines.append("No settled matches yet. Be the first on the board!")
+        return "\n".join(lines)
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    start = (page - 1) * PAGE_SIZE
+    for rank, (user_id, username, won, lost, pts) in enumerate(top[start:start + PAGE_SIZE], start=start + 1):
+        name = html.escape(username or f"User{user_id}")
+        badge = medals.get(rank, f"{rank}.")
+        lines.append(f"{badge} <b>{name}</b> — {pts} pts ({won}W / {lost}L)")
+    return "\n".join(lines)
+
+def build_markup(page, pages, private=True):
+    markup = types.InlineKeyboardMarkup()
+    nav = []
+    if page > 1:
+        nav.append(types.InlineKeyboardButton("⬅️ Prev", callback_data=f"{CALLBACK_ACTION}:{page - 1}"))
+    if page < pages:
+        nav.append(types.InlineKeyboardButton("Next ➡️", callback_data=f"{CALLBACK_ACTION}:{page + 1}"))
+    if nav:
+        markup.row(*nav)
+    if private:
+        markup.add(types.InlineKeyboardButton("🔙 Back", callback_data="user_main_menu"))
+    return markup
+
+def user_footer(user_id):
+    """The caller's own standing, served from the in-memory rank index."""
+    ranked = stats_db.get_user_rank(user_id)
+    if ranked is None:
+        return "\n\n<i>You're not ranked yet — play a match to join the board.</i>"
+    pts, rank, total = ranked
+    return f"\n\n<i>Your rank: {rank} / {total} ({pts} pts)</i>"
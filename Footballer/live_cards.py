@@ -0,0 +1,117 @@
+import hashlib
+import threading
+
+import db
+import delivery
+from predictions_db import DB_FILE
+
+# -----------------------------------------------------------------------------
+# Live score cards
+# -----------------------------------------------------------------------------
+# In card mode ("live_cards": true in config.json) each chat gets one
+# scoreboard message per fixture, which is edited in place on every goal
+# instead of a new message being sent. The card's message_id and a digest of
+# its text are kept in predictions.db, so cards survive a restart and an
+# update whose rendered text did not change costs no API call at all. A
+# fixture's cards are forgotten once it finishes.
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS live_cards (
+        fixture_id INTEGER NOT NULL,
+        chat_id INTEGER NOT NULL,
+        message_id INTEGER NOT NULL,
+        text_digest TEXT NOT NULL,
+        PRIMARY KEY (fixture_id, chat_id)
+    ) WITHOUT ROWID;
+"""
+
+def init_db():
+    conn = db.get_connection(DB_FILE)
+    conn.executescript(SCHEMA)
+    conn.commit()
+
+init_db()
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+class LiveCards:
+    def __init__(self):
+        self.sent = 0        # new cards posted
+        self.edited = 0      # cards updated in place
+        self.unchanged = 0   # updates skipped, the card already showed that text
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def _load(self, fixture_id):
+        conn = db.get_connection(DB_FILE)
+        rows = conn.execute(
+            "SELECT chat_id, message_id, text_digest FROM live_cards WHERE fixture_id = ?",
+            (int(fixture_id),)
+        ).fetchall()
+        return {chat_id: (message_id, digest) for (chat_id, message_id, digest) in rows}
+
+    def push(self, bot, fixture_id, messages):
+        """
+        Show each (chat_id, text) of `messages` in that chat's card for the
+        fixture. Blocks until done and returns the DeliveryReport of the
+        sends/edits that were actually needed.
+        """
+        cards = self._load(fixture_id)
+        pending = []
+        unchanged = 0
+        for chat_id, text in messages:
+            chat_id = int(chat_id)
+            digest = _digest(text)
+            card = cards.get(chat_id)
+            if card and card[1] == digest:
+                unchanged += 1
+                continue
+            pending.append((chat_id, text, digest, card[0] if card else None))
+
+        report, results = delivery.get_engine(bot).send_cards(
+            (chat_id, text, message_id, {"parse_mode": "HTML"})
+            for (chat_id, text, _, message_id) in pending
+        )
+
+        rows = []
+        sent = edited = 0
+        for chat_id, _, digest, old_message_id in pending:
+            outcome, message_id = results.get(chat_id, (delivery.FAILED, None))
+            if outcome != delivery.DELIVERED:
+                continue
+            if message_id == old_message_id:
+                edited += 1
+            else:
+                sent += 1
+            rows.append((int(fixture_id), chat_id, message_id, digest))
+        if rows:
+            with db.transaction(DB_FILE) as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO live_cards (fixture_id, chat_id, message_id, text_digest) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows
+                )
+
+        with self._lock:
+            self.sent += sent
+            self.edited += edited
+            self.unchanged += unchanged
+            self.failed += len(pending) - len(rows)
+        return report
+
+    def forget(self, fixture_id):
+        """Drop a fixture's cards (it finished; the cards stay as they are in the chats)."""
+        with db.transaction(DB_FILE) as conn:
+            conn.execute("DELETE FROM live_cards WHERE fixture_id = ?", (int(fixture_id),))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "edited": self.edited,
+                "unchanged": self.unchanged,
+                "failed": self.failed,
+            }
+
+CARDS = LiveCards()
@@ -0,0 +1,87 @@
+import time
+import threading
+
+# -----------------------------------------------------------------------------
+# Live update coalescing
+# -----------------------------------------------------------------------------
+# A score change opens a window for its fixture instead of being broadcast
+# right away. Further changes inside the window only replace the pending
+# state ("merged"), and when the window closes one update with the latest
+# score goes out. If the score ended where the last broadcast left it (a goal
+# that VAR took back), nothing is sent ("suppressed"). Pending updates of a
+# fixture that finishes are dropped too: the final result supersedes them.
+#
+# The window ("live_coalesce_window" in config.json, seconds) is checked on
+# every monitor tick, so an update waits at most window + one poll interval.
+# The default 0 turns coalescing off: an update goes out on the tick that saw
+# the change, as before.
+
+DEFAULT_WINDOW = 0
+
+class PendingUpdate:
+    __slots__ = ("fixture_id", "baseline", "score", "time_str", "opened", "changes")
+
+    def __init__(self, fixture_id, baseline, score, time_str, opened):
+        self.fixture_id = fixture_id
+        self.baseline = baseline   # score as last broadcast (None before the first one)
+        self.score = score
+        self.time_str = time_str
+        self.opened = opened
+        self.changes = 1
+
+class LiveCoalescer:
+    def __init__(self):
+        self.changes = 0      # score transitions seen
+        self.merged = 0       # transitions folded into an already pending update
+        self.suppressed = 0   # pending updates dropped (score reverted, or fixture finished)
+        self.delivered = 0    # updates released for broadcast
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def offer(self, fixture_id, baseline, score, time_str):
+        """Record a score change from `baseline` to `score`."""
+        with self._lock:
+            self.changes += 1
+            entry = self._pending.get(fixture_id)
+            if entry is None:
+                self._pending[fixture_id] = PendingUpdate(
+                    fixture_id, baseline, score, time_str, time.monotonic()
+                )
+                return
+            entry.score = score
+            entry.time_str = time_str
+            entry.changes += 1
+            self.merged += 1
+
+    def drop(self, fixture_id):
+        with self._lock:
+            if self._pending.pop(fixture_id, None) is not None:
+                self.suppressed += 1
+
+    def due(self, window):
+        """Remove and return the pending updates whose window has closed."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for fixture_id, entry in list(self._pending.items()):
+                if now - entry.opened < window:
+                    continue
+                del self._pending[fixture_id]
+                if entry.score == entry.baseline:
+                    self.suppressed += 1
+                    continue
+                self.delivered += 1
+                ready.append(entry)
+        return ready
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "changes": self.changes,
+                "merged": self.merged,
+                "suppressed": self.suppressed,
+                "delivered": self.delivered,
+            }
+
+COALESCER = LiveCoalescer()
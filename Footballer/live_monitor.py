@@ -1,143 +1,197 @@
-import os
-import json
-import time
 import threading
-import requests
-import sqlite3
-
-from match_finished import process_finished_match
-
-CONFIG_FILE = "config.json"
-FIXED_MATCHES_FILE = "FixedMatches.json"
-LIVE_MATCHES_FILE = "live_matches.json"
-DB_FILE = "predictions.db"
+from concurrent.futures import ThreadPoolExecutor
+
+import delivery
+import http_client
+import predictions_db
+import fixed_matches
+from match_finished import process_finished_match, resume_settlements
+from monitor_scheduler import SCHEDULER
+from live_state import LIVE_STATE
+from live_cards import CARDS
+from live_coalescer import COALESCER, DEFAULT_WINDOW
+import config_service
+from fixture_catalog import DEFAULT_LEAGUE
+
+LIVE_URL = "http://127.0.0.1:5000/odds/live"
+LEAGUE_POLL_WORKERS = 4   # league feeds fetched at once
+
+# Only the monitor thread polls, so one small pool is enough.
+_league_pool = ThreadPoolExecutor(max_workers=LEAGUE_POLL_WORKERS, thread_name_prefix="live-league")
 
 def start_live_monitor(bot):
     """
     Starts a background thread that periodically calls the live odds API 
     and notifies users of score changes / final results.
     """
-    with open(CONFIG_FILE, "r") as f:
-        config = json.load(f)
-    apikey = config.get("apikey", "")
-    tocheck = config.get("tocheck", 10)  # check interval in seconds
+    SCHEDULER.interval = config_service.settings().tocheck  # check interval in seconds
 
     thread = threading.Thread(
         target=_live_monitor_loop,
-        args=(bot, apikey, tocheck),
+        args=(bot,),
         daemon=True
     )
     thread.start()
 
-def _live_monitor_loop(bot, apikey, interval):
+def _live_monitor_loop(bot):
     """
-    Continuously runs in the background, polling the local API every `interval` seconds.
-    Checks which fixtures we have in FixedMatches.json, updates them if goals changed,
-    and calls process_finished_match when a fixture is done.
+    Continuously runs in the background, polling the local API every `tocheck` seconds
+    while a fixed match is near kickoff or live (see monitor_scheduler.py), and sleeping
+    until the next kickoff otherwise. Checks which fixtures we have in FixedMatches.json,
+    updates them if goals changed, and calls process_finished_match when a fixture is done.
     """
+    last_result = (set(), set())
+    last_fixed_ids = None
     while True:
         try:
-            # 1. Make the API call
-            url = "http://127.0.0.1:5000/odds/live?league=39"
-            headers = {
-                "x-apisports-key": apikey,
-                "Accept": "application/json"
-            }
-            response = requests.get(url, headers=headers)
-            data = response.json()
-
-            # 2. Get our current list of fixed matches
-            fixed_matches = _load_fixed_matches()
-            fixed_index = {str(m["fixture_id"]): m for m in fixed_matches}
-
-            # 3. Load or init local live data (which includes stored home/away/draw counts)
-            if os.path.exists(LIVE_MATCHES_FILE):
-                try:
-                    with open(LIVE_MATCHES_FILE, "r") as f:
-                        local_live_data = json.load(f)
-                except:
-                    local_live_data = {}
-            else:
-                local_live_data = {}
-
-            # 4. Process each fixture in the API’s response
-            live_items = data.get("response", [])
-            for item in live_items:
-                fixture_id = str(item["fixture"]["id"])
-                if fixture_id not in fixed_index:
-                    continue  # Not one of our tracked matches
-
-                # Extract relevant info
-                home_goals = item["teams"]["home"]["goals"]
-                away_goals = item["teams"]["away"]["goals"]
-                status_long = item["fixture"]["status"]["long"]  # e.g. "Halftime", "Match Finished"
-                time_str = item["fixture"]["status"].get("seconds", "00:00")
-
-                # If this fixture_id not in local data, it's our first time:
-                # compute counts for home/away/draw once.
-                if fixture_id not in local_live_data:
-                    local_live_data[fixture_id] = {
-                        "home_goals": home_goals,
-                        "away_goals": away_goals,
-                        "counts": _calculate_prediction_counts(fixture_id)
-                    }
-                    # We can send an initial broadcast to group and users if you like:
-                    _broadcast_score_update(
-                        bot, fixture_id, home_goals, away_goals,
-                        time_str, local_live_data[fixture_id]["counts"]
-                    )
-                else:
-                    old_home = local_live_data[fixture_id].get("home_goals")
-                    old_away = local_live_data[fixture_id].get("away_goals")
-                    # If goals changed => broadcast
-                    if home_goals != old_home or away_goals != old_away:
-                        _broadcast_score_update(
-                            bot, fixture_id, home_goals, away_goals,
-                            time_str, local_live_data[fixture_id]["counts"]
-                        )
-
-                # Check if match is finished
-                if status_long.lower() in ("match finished", "finished", "full time"):
-                    # Let match_finished.py handle final logic. We pass the 'counts' dict.
-                    counts = local_live_data.get(fixture_id, {}).get("counts", {})
-                    process_finished_match(
-                        bot, fixture_id, home_goals, away_goals, counts
-                    )
-                    # Remove from local tracking
-                    if fixture_id in local_live_data:
-                        del local_live_data[fixture_id]
-                    continue
-
-                # Otherwise, update local tracking with new scores
-                local_live_data[fixture_id]["home_goals"] = home_goals
-                local_live_data[fixture_id]["away_goals"] = away_goals
-
-            # 5. Save updated local data
-            with open(LIVE_MATCHES_FILE, "w") as f:
-                json.dump(local_live_data, f, indent=4)
-
+            # Finish any settlement a previous run (or tick) was interrupted in
+            resume_settlements(bot)
+        except Exception as e:
+            print(f"[live_monitor ERROR] Resuming settlements failed: {e}")
+        try:
+            # 1. Make the API call (a 304 means the feed hasn't changed)
+            conf = config_service.settings()
+            SCHEDULER.interval = conf.tocheck
+            data, changed = fetch_live(conf.apikey, tracked_leagues())
+            fixed_ids = fixed_matches.REGISTRY.ids()
+            if changed or fixed_ids != last_fixed_ids:
+                last_result = process_live_data(bot, data, changed)
+                last_fixed_ids = fixed_ids
+            deliver_due_updates(bot)
+            SCHEDULER.observe(*last_result)
         except Exception as e:
             print(f"[live_monitor ERROR] {e}")
 
-        time.sleep(interval)
+        SCHEDULER.sleep(SCHEDULER.next_delay())
 
-def _load_fixed_matches():
-    """Return the list of items in FixedMatches.json, or [] on error."""
-    if not os.path.exists(FIXED_MATCHES_FILE):
-        return []
-    try:
-        with open(FIXED_MATCHES_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return []
+def tracked_leagues():
+    """
+    The leagues to poll: those of the fixed matches. Entries saved before
+    the league was recorded belong to DEFAULT_LEAGUE.
+    """
+    return sorted({DEFAULT_LEAGUE if league is None else int(league)
+                   for league in fixed_matches.REGISTRY.leagues()})
+
+def fetch_live(apikey, leagues):
+    """
+    Poll the live feed of every league in `leagues` concurrently and merge
+    them into one payload. Returns (data, changed), changed if any feed did.
+    """
+    headers = live_headers(apikey)
 
-def _broadcast_score_update(bot, fixture_id, home_goals, away_goals, time_str, counts):
+    def fetch(league):
+        try:
+            return http_client.get_json(
+                LIVE_URL, params={"league": league}, headers=headers, endpoint="live", conditional=True
+            )
+        except Exception as e:
+            return league_failed(league, e)
+
+    return merge_live(_league_pool.map(fetch, leagues))
+
+def league_failed(league, error):
+    # Keep the league's last payload, so its fixtures don't look gone for a tick.
+    print(f"[live_monitor WARNING] Live feed for league {league} failed: {error}")
+    cached = http_client.CLIENT.cached(live_key(league))
+    return cached or {}, False
+
+def live_key(league):
+    """http_client's conditional-cache key of one league's live feed."""
+    return (LIVE_URL, (("league", league),))
+
+def merge_live(results):
+    """Merge per-league (data, changed) results into one (data, changed)."""
+    items = []
+    changed = False
+    for data, league_changed in results:
+        items.extend((data or {}).get("response", []))
+        changed = changed or league_changed
+    return {"response": items}, changed
+
+def live_headers(apikey):
+    return {
+        "x-apisports-key": apikey
+    }
+
+def process_live_data(bot, data, fetched=True):
+    """
+    Handle one live API payload: broadcast score changes for our fixed
+    matches and settle the ones that finished. Shared by the threaded loop
+    and the asyncio runtime (which calls it off the event loop). `fetched`
+    is False when no feed returned new data (failed or unchanged).
+    Returns (live_ids, finished_ids): the tracked fixtures seen in the payload.
+    """
+    live_ids = set()
+    finished_ids = set()
+    # 2. Get our current list of fixed matches
+    fixed_ids = fixed_matches.REGISTRY.ids()
+
+    # 3. Last seen score per fixture, kept in memory (see live_state.py)
+    live_state = LIVE_STATE
+    # Saved state was unreadable: record the first fetched payload's scores
+    # without announcing them (they were announced before the restart)
+    seeding = fetched and live_state.take_seed()
+
+    # 4. Process each fixture in the API’s response
+    live_items = data.get("response", [])
+    for item in live_items:
+        fixture_id = str(item["fixture"]["id"])
+        if fixture_id not in fixed_ids:
+            continue  # Not one of our tracked matches
+        live_ids.add(fixture_id)
+
+        # Extract relevant info
+        home_goals = item["teams"]["home"]["goals"]
+        away_goals = item["teams"]["away"]["goals"]
+        status_long = item["fixture"]["status"]["long"]  # e.g. "Halftime", "Match Finished"
+        time_str = item["fixture"]["status"].get("seconds", "00:00")
+
+        # First sighting of the fixture, or goals changed => queue a broadcast
+        # (coalesced per fixture, sent by deliver_due_updates)
+        previous = live_state.get(fixture_id)
+        if previous != (home_goals, away_goals) and not seeding:
+            COALESCER.offer(fixture_id, previous, (home_goals, away_goals), time_str)
+
+        # Check if match is finished
+        if status_long.lower() in ("match finished", "finished", "full time"):
+            # The final result supersedes a pending live update
+            COALESCER.drop(fixture_id)
+            # Let match_finished.py handle final logic.
+            process_finished_match(bot, fixture_id, home_goals, away_goals)
+            # Remove from local tracking
+            live_state.remove(fixture_id)
+            CARDS.forget(fixture_id)
+            finished_ids.add(fixture_id)
+            continue
+
+        # Otherwise, update local tracking with new scores
+        live_state.set(fixture_id, home_goals, away_goals)
+
+    # 5. Persist the tracking state, only if something changed
+    live_state.flush()
+
+    return live_ids, finished_ids
+
+def deliver_due_updates(bot):
+    """
+    Broadcast the coalesced score updates whose window has closed (see
+    live_coalescer.py). Called on every monitor tick, changed feed or not.
+    """
+    window = config_service.settings().get("live_coalesce_window", DEFAULT_WINDOW)
+    for entry in COALESCER.due(window):
+        if entry.changes > 1:
+            print(f"[live_monitor] Coalesced {entry.changes} score changes for {entry.fixture_id}")
+        home_goals, away_goals = entry.score
+        _broadcast_score_update(bot, entry.fixture_id, home_goals, away_goals, entry.time_str)
+
+def _broadcast_score_update(bot, fixture_id, home_goals, away_goals, time_str):
     """
     Broadcast a *live score update* to:
       1) Each user who predicted this fixture (user-level DM).
-      2) The group, showing how many predicted home/away/draw from `counts`.
+      2) The group, showing how many predicted home/away/draw (read from the
+         incrementally maintained counters, so always current).
     """
-    match_data = _get_fixed_match(fixture_id)
+    match_data = fixed_matches.get_fixed_match(fixture_id)
     if not match_data:
         return
 
@@ -152,6 +206,7 @@ def _broadcast_score_update(bot, fixture_id, home_goals, away_goals, time_str, c
         f"Time: <b>{time_str}</b>"
     )
     # Build group-level message (add predictions count)
+    counts = _calculate_prediction_counts(fixture_id)
     c_home = counts.get("home", 0)
     c_away = counts.get("away", 0)
     c_draw = counts.get("draw", 0)
@@ -167,109 +222,34 @@ def _broadcast_score_update(bot, fixture_id, home_goals, away_goals, time_str, c
         f"  • Draw: {c_draw}"
     )
 
-    # 1. Send to users who predicted
-    user_ids = _get_user_ids_for_fixture(fixture_id)
-    for uid in user_ids:
-        try:
-            bot.send_message(uid, text_user, parse_mode="HTML")
-        except Exception as e:
-            print(f"[live_monitor WARNING] Could not send update to user {uid}: {e}")
-
-    # 2. Send to group
-    group_id = _read_group_id()
-    if group_id:
-        try:
-            bot.send_message(group_id, text_group, parse_mode="HTML")
-        except Exception as e:
-            print(f"[live_monitor WARNING] Could not send update to group {group_id}: {e}")
+    # 1. Users who predicted, 2. the group -- all through the shared delivery engine
+    conf = config_service.settings()
+    messages = [(uid, text_user) for uid in _get_user_ids_for_fixture(fixture_id)]
+    if conf.group_id:
+        messages.append((conf.group_id, text_group))
+    if conf.get("live_cards", False):
+        # Card mode: edit each chat's scoreboard message in place (see live_cards.py)
+        report = CARDS.push(bot, fixture_id, messages)
+    else:
+        report = delivery.get_engine(bot).send_many(
+            (chat_id, text, {"parse_mode": "HTML"}) for (chat_id, text) in messages
+        )
+    print(f"[live_monitor] Score update for {fixture_id}: {report}")
 
 def _calculate_prediction_counts(fixture_id):
     """
-    Reads the table fixture_<fixture_id> in predictions.db, 
-    for each user parse the prediction "X - Y":
-      - if X>Y => home
-      - if X<Y => away
-      - if X==Y => draw
-    Returns a dict like {"home": #, "away": #, "draw": #}
-    """
-    home_count = 0
-    away_count = 0
-    draw_count = 0
-
-    table_name = f"fixture_{fixture_id}"
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    # Check table existence
-    try:
-        c.execute(f'SELECT user_id, prediction FROM "{table_name}"')
-        rows = c.fetchall()
-        for row in rows:
-            pred_str = row[1]
-            h, a = _parse_prediction(pred_str)
-            if h > a:
-                home_count += 1
-            elif a > h:
-                away_count += 1
-            else:
-                draw_count += 1
-    except:
-        pass
-    conn.close()
-    return {"home": home_count, "away": away_count, "draw": draw_count}
-
-def _parse_prediction(pred_str):
-    """
-    e.g. "2 - 1" => (2,1). If parse error => (0,0).
+    Returns a dict like {"home": #, "away": #, "draw": #} for the fixture,
+    from the prediction_counts row kept up to date by store_prediction.
     """
     try:
-        parts = pred_str.replace(" ", "").split("-")
-        h = int(parts[0])
-        a = int(parts[1])
-        return (h, a)
-    except:
-        return (0, 0)
-
-def _get_fixed_match(fixture_id):
-    if not os.path.exists(FIXED_MATCHES_FILE):
-        return None
-    try:
-        with open(FIXED_MATCHES_FILE, "r") as f:
-            data = json.load(f)
-        for item in data:
-            if str(item["fixture_id"]) == str(fixture_id):
-                return item
-    except:
-        pass
-    return None
+        return predictions_db.get_outcome_counts(fixture_id)
+    except Exception as e:
+        print(f"[live_monitor WARNING] Could not count predictions for {fixture_id}: {e}")
+        return {"home": 0, "away": 0, "draw": 0}
 
 def _get_user_ids_for_fixture(fixture_id):
     """
-    Looks up user_ids by reading the table fixture_<fixture_id> in predictions.db.
-    Returns a list of user_ids or an empty list if no table or no records.
+    Looks up the user_ids who predicted this fixture in the predictions table.
+    Returns an empty list if there are no records.
     """
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    table_name = f'fixture_{fixture_id}'
-    c.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name=?;",
-        (table_name,)
-    )
-    row = c.fetchone()
-    if not row:
-        conn.close()
-        return []
-    c.execute(f'SELECT user_id FROM "{table_name}"')
-    rows = c.fetchall()
-    conn.close()
-    return [r[0] for r in rows]
-
-def _read_group_id():
-    config_path = CONFIG_FILE
-    if not os.path.exists(config_path):
-        return None
-    try:
-        with open(config_path, "r") as f:
-            conf = json.load(f)
-        return conf.get("groupid")
-    except:
-        return None
+    return predictions_db.get_user_ids(fixture_id)
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import threading
+
+# -----------------------------------------------------------------------------
+# Live tracking state (last seen score per tracked fixture)
+# -----------------------------------------------------------------------------
+# Held in memory and persisted to live_matches.json only when it changed.
+# A flush writes compact JSON to a temp file, fsyncs it and renames it over
+# the old file, so a crash leaves either the previous or the new state,
+# never a truncated one. Flush counts, skips and durations are kept for the
+# admin panel.
+#
+# If the file exists but cannot be read, the last seen scores are unknown:
+# the state is then seeded from the next live payload without broadcasting
+# (see take_seed), instead of re-announcing every in-play fixture.
+
+LIVE_MATCHES_FILE = "live_matches.json"
+
+class LiveState:
+    def __init__(self, path=LIVE_MATCHES_FILE):
+        self.path = path
+        self.flushes = 0
+        self.skipped_flushes = 0   # flush() calls with nothing to write
+        self.flush_time_total = 0.0
+        self.flush_time_max = 0.0
+        self.last_flush_bytes = 0
+        self._scores = None        # fixture_id -> [home_goals, away_goals]
+        self._dirty = False
+        self._seed = False         # next payload only seeds the state (file was unreadable)
+        self._lock = threading.Lock()
+
+    def _load_locked(self):
+        if self._scores is not None:
+            return
+        self._scores = {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+            for fixture_id, entry in raw.items():
+                self._scores[fixture_id] = [entry.get("home_goals"), entry.get("away_goals")]
+        except (OSError, ValueError, AttributeError) as e:
+            # Keep the unreadable file for inspection; it is only replaced on
+            # the next real change.
+            self._scores = {}
+            self._seed = True
+            print(f"[live_state WARNING] {self.path} is unreadable ({type(e).__name__}); "
+                  f"seeding from the next live payload without broadcasting")
+
+    # ---------------------------
+    # Reads / writes (memory only)
+    # ---------------------------
+    def get(self, fixture_id):
+        """Return the last seen (home_goals, away_goals), or None if untracked."""
+        with self._lock:
+            self._load_locked()
+            score = self._scores.get(fixture_id)
+            return tuple(score) if score is not None else None
+
+    def take_seed(self):
+        """
+        True (once) if the saved state could not be loaded: the caller should
+        record the next payload's scores without announcing them.
+        """
+        with self._lock:
+            self._load_locked()
+            seed, self._seed = self._seed, False
+            return seed
+
+    def set(self, fixture_id, home_goals, away_goals):
+        with self._lock:
+            self._load_locked()
+            score = [home_goals, away_goals]
+            if self._scores.get(fixture_id) != score:
+                self._scores[fixture_id] = score
+                self._dirty = True
+
+    def remove(self, fixture_id):
+        with self._lock:
+            self._load_locked()
+            if self._scores.pop(fixture_id, None) is not None:
+                self._dirty = True
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+    def flush(self):
+        """Write the state to disk if it changed since the last flush."""
+        with self._lock:
+            if not self._dirty:
+                self.skipped_flushes += 1
+                return False
+            start = time.perf_counter()
+            payload = json.dumps(
+                {fid: {"home_goals": h, "away_goals": a} for fid, (h, a) in self._scores.items()},
+                separators=(",", ":")
+            )
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            elapsed = time.perf_counter() - start
+            self.flushes += 1
+            self.flush_time_total += elapsed
+            self.flush_time_max = max(self.flush_time_max, elapsed)
+            self.last_flush_bytes = len(payload)
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked": len(self._scores or {}),
+                "flushes": self.flushes,
+                "skipped": self.skipped_flushes,
+                "avg_ms": round(self.flush_time_total / self.flushes * 1000, 2) if self.flushes else 0.0,
+                "max_ms": round(self.flush_time_max * 1000, 2),
+                "bytes": self.last_flush_bytes,
+            }
+
+LIVE_STATE = LiveState()
@@ -0,0 +1,159 @@
+import json
+from datetime import datetime, timezone
+
+from telebot import types
+
+import fixed_matches
+
+# -----------------------------------------------------------------------------
+# Inline keyboard cache
+# -----------------------------------------------------------------------------
+# Keyboards are handed to the bot as their serialized JSON (telebot passes a
+# str reply_markup through untouched), so a cached keyboard costs nothing
+# per tap:
+#   - static keyboards (main menu, admin menu, back buttons) are built once;
+#   - score pickers are memoized per (step, fixture, home score);
+#   - the Play menu's per-fixture buttons are built once per FixedMatches
+#     version, and only the per-user "already predicted" marks are added.
+# Anything derived from FixedMatches is dropped whenever the registry
+# reports a change.
+#
+# No lock is held while the registry is read: the registry calls invalidate()
+# with its own lock held, so invalidate() only rebinds module globals.
+
+_static = {}        # name -> JSON
+_pickers = {}       # (step, fixture_id, home_score) -> JSON
+_play_rows = None   # [(fixture_id, button text)] in FixedMatches order
+_generation = 0
+
+def invalidate():
+    """Forget everything derived from FixedMatches (registry listener)."""
+    global _pickers, _play_rows, _generation
+    _generation += 1
+    _pickers = {}
+    _play_rows = None
+
+fixed_matches.REGISTRY.add_listener(invalidate)
+
+def _button(text, callback_data):
+    return types.InlineKeyboardButton(text, callback_data=callback_data)
+
+def _static_markup(name, build):
+    cached = _static.get(name)
+    if cached is None:
+        cached = _static[name] = build().to_json()
+    return cached
+
+# ---------------------------
+# Static keyboards
+# ---------------------------
+def _build_main_menu():
+    markup = types.InlineKeyboardMarkup()
+    markup.row(_button("🎮 Play", "user_play"), _button("📋 My Fixtures", "user_myfixtures"))
+    markup.row(_button("👤 Profile", "user_profile"), _button("🔧 Administration", "user_administration"))
+    markup.row(_button("🏆 Leaderboard", "user_leaderboard"), _button("❓ FAQ", "user_faq"))
+    return markup
+
+def main_menu():
+    """The user main menu (/start, Back, Main Menu)."""
+    return _static_markup("main_menu", _build_main_menu)
+
+def _build_admin_main_menu():
+    markup = types.InlineKeyboardMarkup()
+    markup.row(_button("⚽ Set Match", "set_match"), _button("📋 Fixture", "fixture"))
+    markup.row(_button("👥 Participants", "participants"), _button("📢 Broadcast", "broadcast"))
+    markup.row(_button("🗑️ Remove Match", "remove_match"), _button("📨 Deliveries", "deliveries"))
+    markup.row(_button("📊 Diagnostics", "diagnostics"))
+    return markup
+
+def admin_main_menu():
+    return _static_markup("admin_main_menu", _build_admin_main_menu)
+
+def back_button(callback_data, label="🔙 Back"):
+    """A keyboard holding a single Back-style button."""
+    def build():
+        markup = types.InlineKeyboardMarkup()
+        markup.add(_button(label, callback_data))
+        return markup
+    return _static_markup(("back", callback_data, label), build)
+
+def profile_menu():
+    def build():
+        markup = types.InlineKeyboardMarkup()
+        markup.row(_button("⬇️ Download Predictions", "download_user_predictions"))
+        markup.add(_button("🔙 Back", "user_main_menu"))
+        return markup
+    return _static_markup("profile_menu", build)
+
+def refresh_back(refresh_data, back_data):
+    """A Refresh + Back row, for screens showing live counters."""
+    def build():
+        markup = types.InlineKeyboardMarkup()
+        markup.row(_button("🔄 Refresh", refresh_data), _button("🔙 Back", back_data))
+        return markup
+    return _static_markup(("refresh_back", refresh_data, back_data), build)
+
+def prediction_done():
+    def build():
+        markup = types.InlineKeyboardMarkup()
+        markup.row(_button("🎮 Play Another", "user_play"), _button("🏠 Main Menu", "user_main_menu"))
+        return markup
+    return _static_markup("prediction_done", build)
+
+# ---------------------------
+# Parameterized keyboards
+# ---------------------------
+def score_picker(step, fixture_id, home_score=None):
+    """
+    The 0-10 score keyboard for `step` ("team1" or "team2"). With
+    `home_score` (stateless mode) the team2 buttons carry the home score.
+    """
+    key = (step, str(fixture_id), home_score)
+    pickers = _pickers
+    cached = pickers.get(key)
+    if cached is None:
+        markup = types.InlineKeyboardMarkup()
+        row = []
+        for num in range(0, 11):
+            if step == "team1":
+                cb_data = f"predict_team1:{num}:{fixture_id}"
+            elif home_score is not None:
+                cb_data = f"predict_team2:{num}:{fixture_id}:{home_score}"
+            else:
+                cb_data = f"predict_team2:{num}:{fixture_id}"
+            row.append(_button(str(num), cb_data))
+            if len(row) == 3:
+                markup.row(*row)
+                row = []
+        if row:
+            markup.row(*row)
+        markup.add(_button("🔙 Back", "user_play"))
+        cached = pickers[key] = markup.to_json()
+    return cached
+
+def _play_menu_rows(matches):
+    global _play_rows
+    rows = _play_rows
+    if rows is None:
+        generation = _generation
+        rows = []
+        for match in matches:
+            match_date = datetime.fromtimestamp(match["timestamp"] + 30, timezone.utc).strftime("%d %b")
+            text = f"📆 {match_date}: {match['home']['name']} vs {match['away']['name']}"
+            rows.append((str(match.get("fixture_id")), text))
+        if generation == _generation:
+            _play_rows = rows
+    return rows
+
+def play_menu(matches, predicted):
+    """
+    The Play menu for `matches` (the current fixed matches) with a red mark
+    on fixtures in `predicted` (a set of fixture_id strings).
+    """
+    keyboard = [
+        [{"text": text + " 🔴" if fixture_id in predicted else text,
+          "callback_data": f"play_match:{fixture_id}"}]
+        for (fixture_id, text) in _play_menu_rows(matches)
+    ]
+    keyboard.append([{"text": "🔙 Back", "callback_data": "user_main_menu"}])
+    return json.dumps({"inline_keyboard": keyboard})
@@ -1,219 +1,186 @@
-import os
-import json
-import sqlite3
-
-FIXED_MATCHES_FILE = "FixedMatches.json"
-DB_FILE = "predictions.db"
-USERS_DIR = "users"
-USER_STATS_DB = "users_datab.db"
-CONFIG_FILE = "config.json"
-
-def process_finished_match(bot, fixture_id, home_goals, away_goals, counts):
+import time
+import threading
+
+import delivery
+import predictions_db
+import fixed_matches
+import user_store
+import leaderboard
+import settlement_journal
+from settlement_journal import SCORED, DONE
+import config_service
+
+NOTIFY_BATCH = 10            # notified flags are journaled at least every this many DMs
+NOTIFY_FLUSH_INTERVAL = 1.0  # ... and at least once a second while DMs complete
+
+# Fixtures whose DM job is running in this process
+_active = set()
+_active_lock = threading.Lock()
+
+def process_finished_match(bot, fixture_id, home_goals, away_goals):
     """
     Updated finalizing logic:
-      1) remove match from FixedMatches.json
-      2) broadcast final result to each user (DM)
-      3) in the group, show final result plus how many got it correct & how many didn't
-         also show the existing home/away/draw counts from 'counts'
-      4) update user JSON with final_score
-      5) track user stats in users_datab.db
+      1) score every predictor and track user stats in users_datab.db, in the
+         same transaction as the settlement journal (see settlement_journal.py),
+         and invalidate the cached leaderboard
+      2) store the final_score on the fixture's prediction rows
+      3) remove match from FixedMatches.json
+      4) in the group, show final result plus how many got it correct & how many didn't
+         also show the home/away/draw prediction counters
+      5) queue the final result DM for each user as a background delivery job
+    Scoring is committed before anything is sent. A fixture that was already
+    scored is never credited again; only its unfinished steps are resumed.
+    Returns the DeliveryJob (None if there is nothing left to do).
+    """
+    fixture_id = str(fixture_id)
+    if settlement_journal.get_settlement(fixture_id) is None:
+        match_data = fixed_matches.get_fixed_match(fixture_id)
+        if not match_data:
+            return None
+        _score_fixture(fixture_id, match_data, home_goals, away_goals)
+    return _resume_settlement(bot, fixture_id)
+
+def resume_settlements(bot):
+    """
+    Finish settlements interrupted by a restart or an error partway through.
+    The live monitors call this on every tick, whatever the feed does.
     """
-    match_data = _get_fixed_match(fixture_id)
-    if not match_data:
+    for fixture_id in settlement_journal.open_settlements():
+        with _active_lock:
+            if str(fixture_id) in _active:
+                continue  # DMs still going out
+        print(f"[match_finished] Resuming settlement of {fixture_id}")
+        try:
+            _resume_settlement(bot, str(fixture_id))
+        except Exception as e:
+            print(f"[match_finished ERROR] Could not resume {fixture_id}: {e}")
+
+# ---------------------------
+# Internal helpers
+# ---------------------------
+def _score_fixture(fixture_id, match_data, home_goals, away_goals):
+    # Score everyone in one pass, then write all stat changes (and the
+    # journal) in one transaction
+    started = time.perf_counter()
+    results = []
+    for (user_id, username, pred_home, pred_away) in user_store.get_fixture_predictors(fixture_id):
+        won = pred_home == home_goals and pred_away == away_goals
+        results.append((user_id, username or f"User{user_id}", won, pred_home, pred_away))
+
+    if not settlement_journal.record_scored(
+        fixture_id, match_data["home"]["name"], match_data["away"]["name"],
+        home_goals, away_goals, results
+    ):
         return
+    correct_count = sum(1 for r in results if r[2])
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"[match_finished] Settled {fixture_id}: {len(results)} predictions "
+        f"({correct_count} won / {len(results) - correct_count} lost) in {elapsed_ms:.1f} ms"
+    )
 
-    home_name = match_data["home"]["name"]
-    away_name = match_data["away"]["name"]
+    # Standings changed: the next leaderboard view re-materializes the top N.
+    leaderboard.bump_version()
 
-    text_template = (
-        f"🏁 <b>The match {home_name} vs {away_name} has finished!</b>\n"
-        f"Final Score: <b>{home_goals} - {away_goals}</b>\n"
-        f"Your Prediction: <b>{{pred}}</b>\n\n"
-        "Thanks for playing!"
-    )
+def _resume_settlement(bot, fixture_id):
+    settlement = settlement_journal.get_settlement(fixture_id)
+    if settlement is None or settlement["state"] == DONE:
+        return None
+    with _active_lock:
+        if fixture_id in _active:
+            return None  # DMs already going out
+        _active.add(fixture_id)
+    try:
+        engine = delivery.get_engine(bot)
+        if settlement["state"] == SCORED:
+            _announce(engine, fixture_id, settlement)
+            settlement_journal.set_state(fixture_id, settlement_journal.ANNOUNCED)
+
+        home_name = settlement["home_name"]
+        away_name = settlement["away_name"]
+        text_template = (
+            f"🏁 <b>The match {home_name} vs {away_name} has finished!</b>\n"
+            f"Final Score: <b>{settlement['home_goals']} - {settlement['away_goals']}</b>\n"
+            f"Your Prediction: <b>{{pred}}</b>\n\n"
+            "Thanks for playing!"
+        )
+        dms = [
+            (user_id, text_template.format(pred=f"{pred_home} - {pred_away}"), {"parse_mode": "HTML"})
+            for (user_id, pred_home, pred_away) in settlement_journal.pending_notifications(fixture_id)
+        ]
+        # Then the per-user DMs as a background job (progress on the admin panel)
+        tracker = _NotifyTracker(fixture_id)
+        return engine.submit(
+            dms,
+            label=f"Final results {home_name} vs {away_name}",
+            on_result=tracker.add,
+            on_done=tracker.finish
+        )
+    except:
+        with _active_lock:
+            _active.discard(fixture_id)
+        raise
+
+def _announce(engine, fixture_id, settlement):
+    home_goals = settlement["home_goals"]
+    away_goals = settlement["away_goals"]
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    table_name = f"fixture_{fixture_id}"
-    c.execute("""SELECT name FROM sqlite_master 
-                 WHERE type='table' AND name=?""", (table_name,))
-    table_exists = c.fetchone()
-
-    correct_count = 0
-    incorrect_count = 0
-
-    if table_exists:
-        c.execute(f'SELECT user_id, prediction FROM "{table_name}"')
-        rows = c.fetchall()
-        for (user_id, user_prediction) in rows:
-            # DM the user final scoreboard
-            final_text = text_template.format(pred=user_prediction)
-            try:
-                bot.send_message(user_id, final_text, parse_mode="HTML")
-            except:
-                pass
-
-            # Save the final score in the user's JSON
-            _update_user_json_final_score(user_id, fixture_id, home_goals, away_goals)
-
-            # Check if correct
-            h, a = _parse_prediction(user_prediction)
-            if h == home_goals and a == away_goals:
-                correct_count += 1
-                result_type = "won"
-            else:
-                incorrect_count += 1
-                result_type = "lost"
-
-            # Update user stats in users_datab.db
-            username = _get_username_from_json(user_id) or f"User{user_id}"
-            _update_user_stats_db(user_id, username, result_type)
-    conn.close()
+    # Save the final score on every prediction row (one UPDATE for the fixture)
+    predictions_db.set_final_score(fixture_id, home_goals, away_goals)
 
     # Remove from FixedMatches.json
-    _remove_from_fixed_matches(fixture_id)
+    fixed_matches.remove_fixed_match(fixture_id)
 
-    # Announce final to the group
-    group_id = _read_group_id()
+    # Announce final to the group straight away
+    group_id = config_service.settings().group_id
     if group_id:
+        counts = predictions_db.get_outcome_counts(fixture_id)
         c_home = counts.get("home", 0)
         c_away = counts.get("away", 0)
         c_draw = counts.get("draw", 0)
         group_text = (
-            f"🏁 <b>{home_name} vs {away_name}</b> just finished!\n"
+            f"🏁 <b>{settlement['home_name']} vs {settlement['away_name']}</b> just finished!\n"
             f"Final Score: <b>{home_goals} - {away_goals}</b>\n"
             f"Home Predictions: {c_home}\n"
             f"Away Predictions: {c_away}\n"
             f"Draw Predictions: {c_draw}\n\n"
-            f"Won 👑: <b>{correct_count}</b>  |  Lost 🔴: <b>{incorrect_count}</b>"
+            f"Won 👑: <b>{settlement['correct']}</b>  |  Lost 🔴: <b>{settlement['incorrect']}</b>"
         )
-        try:
-            bot.send_message(group_id, group_text, parse_mode="HTML")
-        except Exception as e:
-            print(f"[match_finished WARNING] Could not broadcast final to group {group_id}: {e}")
-
-# ---------------------------
-# Internal helpers
-# ---------------------------
-def _remove_from_fixed_matches(fixture_id):
-    if not os.path.exists(FIXED_MATCHES_FILE):
-        return
-    try:
-        with open(FIXED_MATCHES_FILE, "r") as f:
-            data = json.load(f)
-        new_data = [m for m in data if str(m["fixture_id"]) != str(fixture_id)]
-        with open(FIXED_MATCHES_FILE, "w") as f:
-            json.dump(new_data, f, indent=4)
-    except:
-        pass
+        if engine.deliver(group_id, group_text, parse_mode="HTML") != delivery.DELIVERED:
+            print(f"[match_finished WARNING] Could not broadcast final to group {group_id}")
 
-def _get_fixed_match(fixture_id):
-    if not os.path.exists(FIXED_MATCHES_FILE):
-        return None
-    try:
-        with open(FIXED_MATCHES_FILE, "r") as f:
-            data = json.load(f)
-        for item in data:
-            if str(item["fixture_id"]) == str(fixture_id):
-                return item
-    except:
-        pass
-    return None
-
-def _update_user_json_final_score(user_id, fixture_id, home_goals, away_goals):
-    user_file = os.path.join(USERS_DIR, f"{user_id}.json")
-    if not os.path.exists(user_file):
-        return
-    try:
-        with open(user_file, "r") as f:
-            user_data = json.load(f)
-    except:
-        return
-    preds = user_data.get("predictions", {})
-    key = str(fixture_id)
-    if key not in preds:
-        return
-    preds[key]["final_score"] = f"{home_goals} - {away_goals}"
-    with open(user_file, "w") as f:
-        json.dump(user_data, f, indent=4)
-
-def _parse_prediction(pred_str):
-    try:
-        parts = pred_str.replace(" ", "").split("-")
-        h = int(parts[0])
-        a = int(parts[1])
-        return (h, a)
-    except:
-        return (0, 0)
-
-def _get_username_from_json(user_id):
-    user_file = os.path.join(USERS_DIR, f"{user_id}.json")
-    if not os.path.exists(user_file):
-        return None
-    try:
-        with open(user_file, "r") as f:
-            data = json.load(f)
-        return data.get("username")
-    except:
-        return None
+class _NotifyTracker:
+    """
+    Journals DM outcomes in small batches. Failed and blocked sends count as
+    handled too, so a restart never retries them; a crash re-sends at most
+    the last unflushed batch (NOTIFY_BATCH DMs, or one second's worth).
+    """
 
-# ---------------------------
-# Stats DB
-# ---------------------------
-def _init_users_db():
-    conn = sqlite3.connect(USER_STATS_DB)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT,
-            won INTEGER DEFAULT 0,
-            lost INTEGER DEFAULT 0,
-            pts INTEGER DEFAULT 0
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def _update_user_stats_db(user_id, username, result_type):
-    _init_users_db()
-    conn = sqlite3.connect(USER_STATS_DB)
-    c = conn.cursor()
-
-    c.execute("SELECT user_id FROM users WHERE user_id=?", (user_id,))
-    row = c.fetchone()
-    if not row:
-        c.execute("""
-            INSERT INTO users (user_id, username, won, lost, pts)
-            VALUES (?, ?, 0, 0, 0)
-        """, (user_id, username))
-        conn.commit()
-
-    if result_type == "won":
-        c.execute("""
-            UPDATE users
-               SET won = won + 1,
-                   pts = pts + 5,
-                   username=?
-             WHERE user_id=?
-        """, (username, user_id))
-    else:
-        c.execute("""
-            UPDATE users
-               SET lost = lost + 1,
-                   username=?
-             WHERE user_id=?
-        """, (username, user_id))
-
-    conn.commit()
-    conn.close()
-
-def _read_group_id():
-    if not os.path.exists(CONFIG_FILE):
-        return None
-    try:
-        with open(CONFIG_FILE, "r") as f:
-            conf = json.load(f)
-        return conf.get("groupid")
-    except:
-        return None
+    def __init__(self, fixture_id):
+        self.fixture_id = fixture_id
+        self._done_ids = []
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, chat_id, outcome):
+        with self._lock:
+            self._done_ids.append(chat_id)
+            if len(self._done_ids) >= NOTIFY_BATCH or \
+                    time.monotonic() - self._flushed_at >= NOTIFY_FLUSH_INTERVAL:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._done_ids:
+            settlement_journal.mark_notified(self.fixture_id, self._done_ids)
+        self._done_ids = []
+        self._flushed_at = time.monotonic()
+
+    def finish(self, job):
+        try:
+            with self._lock:
+                self._flush_locked()
+            settlement_journal.finish(self.fixture_id)
+            print(f"[match_finished] Final result DMs for {self.fixture_id}: {job}")
+        finally:
+            with _active_lock:
+                _active.discard(self.fixture_id)
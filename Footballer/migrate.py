@@ -0,0 +1,177 @@
+"""
+One-shot migration from the legacy file/table storage into predictions.db.
+
+Imports:
+  1) every "fixture_<id>" table in predictions.db (dropped once imported)
+  2) every fixtures/<id>.json file (rows already present are kept)
+  3) every users/<id>.json profile into `profiles`, plus each stored
+     prediction's match name and final score
+
+Re-running it is harmless. Usage (from the Footballer folder):
+    python migrate.py
+"""
+import os
+import json
+import time
+
+import db
+import user_store
+from predictions_db import DB_FILE, init_db, parse_prediction, rebuild_counters
+
+FIXTURES_DIR = "fixtures"
+USERS_DIR = "users"
+
+def _username_from_json(user_id):
+    user_file = os.path.join(USERS_DIR, f"{user_id}.json")
+    if not os.path.exists(user_file):
+        return None
+    try:
+        with open(user_file, "r") as f:
+            return json.load(f).get("username")
+    except:
+        return None
+
+def migrate_legacy_tables(conn):
+    """
+    Copy every fixture_<id> table into `predictions` and drop it.
+    Returns the number of rows imported.
+    """
+    now = int(time.time())
+    tables = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'fixture\\_%' ESCAPE '\\'"
+    ).fetchall()
+    imported = 0
+    for (table_name,) in tables:
+        try:
+            fixture_id = int(table_name.split("_", 1)[1])
+        except ValueError:
+            continue
+        rows = conn.execute(f'SELECT user_id, prediction, username FROM "{table_name}"').fetchall()
+        for (user_id, prediction, username) in rows:
+            parsed = parse_prediction(prediction)
+            if parsed is None:
+                print(f"[migrate WARNING] Skipping unparsable prediction {prediction!r} "
+                      f"for user {user_id} on fixture {fixture_id}")
+                continue
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO predictions
+                    (fixture_id, user_id, home, away, username, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (fixture_id, user_id, parsed[0], parsed[1], username, now)
+            )
+            imported += 1
+        conn.execute(f'DROP TABLE "{table_name}"')
+    return imported
+
+def migrate_fixture_files(conn):
+    """
+    Import fixtures/<id>.json. Rows that already exist (e.g. from the legacy
+    tables, which also carry the username) are left untouched.
+    Returns the number of rows imported.
+    """
+    if not os.path.exists(FIXTURES_DIR):
+        return 0
+    now = int(time.time())
+    imported = 0
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            fixture_id = int(filename[:-len(".json")])
+            with open(os.path.join(FIXTURES_DIR, filename), "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[migrate WARNING] Skipping {filename}: {e}")
+            continue
+        for user_id_str, prediction in data.get("predictions", {}).items():
+            parsed = parse_prediction(prediction)
+            if parsed is None:
+                continue
+            user_id = int(user_id_str)
+            cur = conn.execute(
+                """
+                INSERT OR IGNORE INTO predictions
+                    (fixture_id, user_id, home, away, username, created_at, match)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (fixture_id, user_id, parsed[0], parsed[1], _username_from_json(user_id), now,
+                 data.get("match"))
+            )
+            imported += cur.rowcount
+    return imported
+
+def migrate_users_dir(conn):
+    """
+    Import users/<id>.json into `profiles`. Each prediction in the file is
+    added to `predictions` if missing, and its match name / final score are
+    filled in where the row doesn't have them yet.
+    Returns the number of profiles imported.
+    """
+    if not os.path.exists(USERS_DIR):
+        return 0
+    now = int(time.time())
+    imported = 0
+    for filename in sorted(os.listdir(USERS_DIR)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            user_id = int(filename[:-len(".json")])
+            with open(os.path.join(USERS_DIR, filename), "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[migrate WARNING] Skipping {filename}: {e}")
+            continue
+        username = data.get("username")
+        conn.execute(
+            """
+            INSERT INTO profiles (user_id, username, created_at, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                username = COALESCE(profiles.username, excluded.username)
+            """,
+            (user_id, username, now, now)
+        )
+        imported += 1
+        for fixture_id_str, info in data.get("predictions", {}).items():
+            parsed = parse_prediction(info.get("prediction", ""))
+            if parsed is None:
+                continue
+            final = parse_prediction(info.get("final_score") or "")
+            fixture_id = int(fixture_id_str)
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO predictions
+                    (fixture_id, user_id, home, away, username, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (fixture_id, user_id, parsed[0], parsed[1], info.get("username") or username, now)
+            )
+            conn.execute(
+                """
+                UPDATE predictions
+                   SET match = COALESCE(match, ?),
+                       final_home = COALESCE(final_home, ?),
+                       final_away = COALESCE(final_away, ?)
+                 WHERE fixture_id=? AND user_id=?
+                """,
+                (info.get("match"), final[0] if final else None, final[1] if final else None,
+                 fixture_id, user_id)
+            )
+    return imported
+
+def migrate():
+    init_db()
+    user_store.init_db()
+    with db.transaction(DB_FILE) as conn:
+        from_tables = migrate_legacy_tables(conn)
+        from_files = migrate_fixture_files(conn)
+        from_users = migrate_users_dir(conn)
+    # Rows above were inserted directly, so recompute the per-fixture tallies.
+    rebuild_counters()
+    print(f"Imported {from_tables} row(s) from fixture tables, {from_files} row(s) from "
+          f"{FIXTURES_DIR}/ and {from_users} profile(s) from {USERS_DIR}/.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,105 @@
+import time
+import threading
+
+import fixed_matches
+
+# -----------------------------------------------------------------------------
+# Kickoff-aware scheduling for the live monitor
+# -----------------------------------------------------------------------------
+# FixedMatches.json entries carry `timestamp` = kickoff - 30s. Instead of
+# polling the live feed every `tocheck` seconds around the clock, the monitor
+# sleeps until shortly before the earliest kickoff, polls at `tocheck` while
+# a tracked match can be live, and backs off once every tracked match has
+# finished.
+
+KICKOFF_OFFSET = 30            # FixedMatches timestamp is kickoff - 30s
+PRE_KICKOFF_LEAD = 5 * 60      # start polling this long before kickoff
+MAX_MATCH_DURATION = 3 * 3600  # kickoff + this => assume the match is over
+IDLE_MAX_SLEEP = 15 * 60       # never sleep longer than this (new fixtures, clock drift)
+
+class MonitorScheduler:
+    """
+    Decides how long the live monitor sleeps between polls.
+
+      - next_wakeup: epoch seconds of the next planned poll
+      - skipped_polls: polls a fixed `interval` loop would have made that
+        this scheduler skipped
+    """
+
+    def __init__(self, interval=10):
+        self.interval = interval
+        self.next_wakeup = None
+        self.skipped_polls = 0
+        self.polls = 0
+        self._live = set()       # tracked fixtures seen live and not finished
+        self._finished = set()   # tracked fixtures reported finished
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        fixed_matches.REGISTRY.add_listener(self.wake)
+
+    # ---------------------------
+    # Feedback from each poll
+    # ---------------------------
+    def observe(self, live_ids, finished_ids):
+        """Record which tracked fixtures the last poll saw live / finished."""
+        with self._lock:
+            self.polls += 1
+            self._finished |= set(finished_ids)
+            self._live = set(live_ids) - self._finished
+
+    def wake(self):
+        """Cut the current sleep short (e.g. an admin just set a match)."""
+        self._wake.set()
+
+    # ---------------------------
+    # Planning
+    # ---------------------------
+    def next_delay(self, now=None):
+        """
+        Return the number of seconds to sleep before the next poll and
+        update next_wakeup / skipped_polls.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            fixed_ids = fixed_matches.REGISTRY.ids()
+            self._finished &= fixed_ids
+            self._live &= fixed_ids
+            kickoffs = [
+                m["timestamp"] + KICKOFF_OFFSET
+                for m in fixed_matches.load_fixed_matches()
+                if str(m["fixture_id"]) not in self._finished
+            ]
+            in_window = any(
+                k - PRE_KICKOFF_LEAD <= now <= k + MAX_MATCH_DURATION for k in kickoffs
+            )
+            if self._live or in_window:
+                delay = self.interval
+            else:
+                upcoming = [k - PRE_KICKOFF_LEAD for k in kickoffs if k - PRE_KICKOFF_LEAD > now]
+                delay = min(upcoming) - now if upcoming else IDLE_MAX_SLEEP
+                delay = max(self.interval, min(delay, IDLE_MAX_SLEEP))
+                self.skipped_polls += int(delay // self.interval) - 1
+            self.next_wakeup = now + delay
+            return delay
+
+    def sleep(self, delay):
+        """Sleep for `delay` seconds, or until wake() is called."""
+        self._wake.wait(delay)
+        self._wake.clear()
+
+    def take_wake(self):
+        """Return True (and reset the flag) if wake() was called since the last check."""
+        if self._wake.is_set():
+            self._wake.clear()
+            return True
+        return False
+
+    def status(self):
+        return {
+            "next_wakeup": self.next_wakeup,
+            "skipped_polls": self.skipped_polls,
+            "polls": self.polls,
+            "live": sorted(self._live),
+        }
+
+SCHEDULER = MonitorScheduler()
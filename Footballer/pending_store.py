@@ -0,0 +1,81 @@
+import time
+import threading
+from collections import OrderedDict
+
+# -----------------------------------------------------------------------------
+# Pending prediction state
+# -----------------------------------------------------------------------------
+# Holds the half-finished Play flow (home score chosen, away score not yet)
+# per (user_id, fixture_id). Entries expire PENDING_TTL seconds after their
+# last use, and the store never holds more than MAX_PENDING entries: the
+# least recently used one is evicted first. Since every touch moves an entry
+# to the end, the front of the OrderedDict is always the next to expire, so
+# expiry only ever looks at the entries it removes.
+
+PENDING_TTL = 30 * 60
+MAX_PENDING = 10000
+
+class PendingEntry:
+    __slots__ = ("team1", "expires")
+
+    def __init__(self, expires):
+        self.team1 = None
+        self.expires = expires
+
+class PendingStore:
+    def __init__(self, ttl=PENDING_TTL, max_size=MAX_PENDING):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.expired = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire_locked(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires > now:
+                break
+            del self._entries[key]
+            self.expired += 1
+
+    def _put_locked(self, key, entry, now):
+        # (Re)insert at the most recently used end, then enforce the size cap.
+        entry.expires = now + self.ttl
+        self._entries[key] = entry
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def start(self, key):
+        """Begin (or restart) the flow for `key`."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_locked(now)
+            self._entries.pop(key, None)
+            self._put_locked(key, PendingEntry(now), now)
+
+    def set_home_score(self, key, score):
+        """Record the home score, starting the flow if it expired or never began."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_locked(now)
+            entry = self._entries.pop(key, None) or PendingEntry(now)
+            entry.team1 = score
+            self._put_locked(key, entry, now)
+
+    def home_score(self, key):
+        """Return the chosen home score, or None if there is no live entry."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_locked(now)
+            entry = self._entries.get(key)
+            return entry.team1 if entry else None
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
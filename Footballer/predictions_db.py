@@ -0,0 +1,236 @@
+import time
+
+import db
+
+# Path to the SQLite database file holding every prediction.
+DB_FILE = "predictions.db"
+
+# -----------------------------------------------------------------------------
+# Schema
+# -----------------------------------------------------------------------------
+# One row per (fixture, user). Scores are stored as integers so readers never
+# have to re-parse "X - Y" strings.
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS predictions (
+        fixture_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        home INTEGER NOT NULL,
+        away INTEGER NOT NULL,
+        username TEXT,
+        created_at INTEGER NOT NULL,
+        PRIMARY KEY (fixture_id, user_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_predictions_user
+        ON predictions (user_id, fixture_id);
+    CREATE INDEX IF NOT EXISTS idx_predictions_score
+        ON predictions (fixture_id, home, away);
+"""
+
+# Per-fixture tallies kept up to date by store_prediction(), so readers get
+# home/away/draw counts and exact-score counts with a primary-key lookup.
+COUNTERS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS prediction_counts (
+        fixture_id INTEGER PRIMARY KEY,
+        home INTEGER NOT NULL DEFAULT 0,
+        away INTEGER NOT NULL DEFAULT 0,
+        draw INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS score_histogram (
+        fixture_id INTEGER NOT NULL,
+        home INTEGER NOT NULL,
+        away INTEGER NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (fixture_id, home, away)
+    ) WITHOUT ROWID;
+"""
+
+# Columns added after the table was first created: name -> SQL type.
+EXTRA_COLUMNS = {
+    "match": "TEXT",
+    "final_home": "INTEGER",
+    "final_away": "INTEGER",
+}
+
+def init_db():
+    """
+    Create the predictions table, its indexes and the counter tables if they
+    do not exist yet. Counters are backfilled the first time they're created.
+    """
+    conn = db.get_connection(DB_FILE)
+    conn.executescript(SCHEMA)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(predictions)")}
+    for name, sql_type in EXTRA_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE predictions ADD COLUMN {name} {sql_type}")
+    has_counters = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='prediction_counts'"
+    ).fetchone()
+    conn.executescript(COUNTERS_SCHEMA)
+    conn.commit()
+    if not has_counters:
+        rebuild_counters()
+
+def rebuild_counters():
+    """
+    Recompute prediction_counts and score_histogram from the predictions
+    table. Only needed after rows were written without store_prediction()
+    (first start, migrate.py).
+    """
+    with db.transaction(DB_FILE) as conn:
+        conn.execute("DELETE FROM prediction_counts")
+        conn.execute("DELETE FROM score_histogram")
+        conn.execute(
+            """
+            INSERT INTO prediction_counts (fixture_id, home, away, draw, total)
+            SELECT fixture_id, SUM(home > away), SUM(home < away), SUM(home = away), COUNT(*)
+              FROM predictions
+             GROUP BY fixture_id
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO score_histogram (fixture_id, home, away, n)
+            SELECT fixture_id, home, away, COUNT(*)
+              FROM predictions
+             GROUP BY fixture_id, home, away
+            """
+        )
+
+init_db()
+
+# -----------------------------------------------------------------------------
+# Writes
+# -----------------------------------------------------------------------------
+def store_prediction(fixture_id, user_id, home, away, username, match=None):
+    """
+    Store (or replace) the user's prediction for a fixture.
+    `home` and `away` are the predicted goals as integers; `match` is the
+    display name, e.g. "Aston Villa vs Chelsea".
+    The fixture's outcome counters and score histogram are updated in the
+    same transaction; a replaced prediction is taken out of them first.
+    """
+    fixture_id, user_id, home, away = int(fixture_id), int(user_id), int(home), int(away)
+    with db.transaction(DB_FILE) as conn:
+        old = conn.execute(
+            "SELECT home, away FROM predictions WHERE fixture_id=? AND user_id=?",
+            (fixture_id, user_id)
+        ).fetchone()
+        if old:
+            _bump_counters(conn, fixture_id, old[0], old[1], -1)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO predictions
+                (fixture_id, user_id, home, away, username, created_at, match)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (fixture_id, user_id, home, away, username, int(time.time()), match)
+        )
+        _bump_counters(conn, fixture_id, home, away, +1)
+
+def _bump_counters(conn, fixture_id, home, away, delta):
+    outcome = "home" if home > away else "away" if away > home else "draw"
+    conn.execute(
+        f"""
+        INSERT INTO prediction_counts (fixture_id, {outcome}, total)
+        VALUES (?, ?, ?)
+        ON CONFLICT(fixture_id) DO UPDATE SET
+            {outcome} = {outcome} + excluded.{outcome},
+            total = total + excluded.total
+        """,
+        (fixture_id, delta, delta)
+    )
+    conn.execute(
+        """
+        INSERT INTO score_histogram (fixture_id, home, away, n)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(fixture_id, home, away) DO UPDATE SET n = n + excluded.n
+        """,
+        (fixture_id, home, away, delta)
+    )
+
+def set_final_score(fixture_id, home_goals, away_goals):
+    """Record the final score on every prediction row of the fixture."""
+    with db.transaction(DB_FILE) as conn:
+        conn.execute(
+            "UPDATE predictions SET final_home=?, final_away=? WHERE fixture_id=?",
+            (int(home_goals), int(away_goals), int(fixture_id))
+        )
+
+# -----------------------------------------------------------------------------
+# Reads
+# -----------------------------------------------------------------------------
+def get_predictions(fixture_id):
+    """
+    Return [(user_id, home, away), ...] for every prediction on the fixture.
+    """
+    conn = db.get_connection(DB_FILE)
+    rows = conn.execute(
+        "SELECT user_id, home, away FROM predictions WHERE fixture_id=?",
+        (int(fixture_id),)
+    ).fetchall()
+    return rows
+
+def get_user_ids(fixture_id):
+    """Return the list of user_ids who predicted the fixture."""
+    conn = db.get_connection(DB_FILE)
+    rows = conn.execute(
+        "SELECT user_id FROM predictions WHERE fixture_id=?",
+        (int(fixture_id),)
+    ).fetchall()
+    return [r[0] for r in rows]
+
+def count_predictions(fixture_id):
+    """Return how many predictions are stored for the fixture."""
+    conn = db.get_connection(DB_FILE)
+    row = conn.execute(
+        "SELECT total FROM prediction_counts WHERE fixture_id=?",
+        (int(fixture_id),)
+    ).fetchone()
+    return row[0] if row else 0
+
+def get_outcome_counts(fixture_id):
+    """
+    Returns a dict like {"home": #, "away": #, "draw": #} for the fixture,
+    read from the incrementally maintained prediction_counts row.
+    """
+    conn = db.get_connection(DB_FILE)
+    row = conn.execute(
+        "SELECT home, away, draw FROM prediction_counts WHERE fixture_id=?",
+        (int(fixture_id),)
+    ).fetchone()
+    if not row:
+        return {"home": 0, "away": 0, "draw": 0}
+    return {"home": row[0], "away": row[1], "draw": row[2]}
+
+def count_exact_score(fixture_id, home, away):
+    """How many users predicted exactly home-away for the fixture."""
+    conn = db.get_connection(DB_FILE)
+    row = conn.execute(
+        "SELECT n FROM score_histogram WHERE fixture_id=? AND home=? AND away=?",
+        (int(fixture_id), int(home), int(away))
+    ).fetchone()
+    return row[0] if row else 0
+
+def get_score_histogram(fixture_id):
+    """Return {(home, away): count} of every predicted score for the fixture."""
+    conn = db.get_connection(DB_FILE)
+    rows = conn.execute(
+        "SELECT home, away, n FROM score_histogram WHERE fixture_id=? AND n > 0",
+        (int(fixture_id),)
+    )
+    return {(h, a): n for (h, a, n) in rows}
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+def parse_prediction(pred_str):
+    """
+    e.g. "2 - 1" => (2, 1). Returns None if the string cannot be parsed.
+    Only needed for legacy data; new rows are stored as integers.
+    """
+    try:
+        parts = pred_str.replace(" ", "").split("-")
+        return (int(parts[0]), int(parts[1]))
+    except:
+        return None
@@ -0,0 +1,96 @@
+import bisect
+import threading
+
+# -----------------------------------------------------------------------------
+# In-memory order-statistics index over user points
+# -----------------------------------------------------------------------------
+# Ranking matches the Profile screen: points DESC, then user_id ASC.
+# A Fenwick tree over point values answers "how many users have more points
+# than p" in O(log P); a sorted list of user_ids per point value breaks ties
+# with a bisect. Built once from users_datab.db, then kept current by the
+# stats writes.
+
+class FenwickTree:
+    """Prefix sums over indexes 0..size-1 with O(log n) update and query."""
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index, delta):
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, index):
+        """Sum of values at indexes 0..index (inclusive)."""
+        i = min(index, self.size - 1) + 1
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+class RankIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = None
+        self._by_pts = {}      # pts -> sorted list of user_ids
+        self._pts = {}         # user_id -> pts
+        self.loaded = False
+
+    def load(self, rows):
+        """(Re)build from an iterable of (user_id, pts)."""
+        with self._lock:
+            self._pts = {uid: max(0, pts or 0) for uid, pts in rows}
+            self._by_pts = {}
+            for uid, pts in self._pts.items():
+                self._by_pts.setdefault(pts, []).append(uid)
+            for ids in self._by_pts.values():
+                ids.sort()
+            self._rebuild_tree(max(self._by_pts, default=0))
+            self.loaded = True
+
+    def _rebuild_tree(self, max_pts):
+        size = 64
+        while size <= max_pts:
+            size *= 2
+        self._tree = FenwickTree(size)
+        for pts, ids in self._by_pts.items():
+            self._tree.add(pts, len(ids))
+
+    def set_points(self, user_id, pts):
+        """Insert the user or move them to a new point total."""
+        pts = max(0, pts or 0)
+        with self._lock:
+            old = self._pts.get(user_id)
+            if old == pts:
+                return
+            if old is not None:
+                ids = self._by_pts[old]
+                del ids[bisect.bisect_left(ids, user_id)]
+                if not ids:
+                    del self._by_pts[old]
+                self._tree.add(old, -1)
+            self._pts[user_id] = pts
+            bisect.insort(self._by_pts.setdefault(pts, []), user_id)
+            if pts >= self._tree.size:
+                self._rebuild_tree(pts)
+            else:
+                self._tree.add(pts, 1)
+
+    def points(self, user_id):
+        with self._lock:
+            return self._pts.get(user_id)
+
+    def rank(self, user_id):
+        """Return (rank, total_users), or None if the user isn't indexed."""
+        with self._lock:
+            pts = self._pts.get(user_id)
+            if pts is None:
+                return None
+            total = len(self._pts)
+            above = total - self._tree.prefix_sum(pts)
+            ties_before = bisect.bisect_left(self._by_pts[pts], user_id)
+            return (above + ties_before + 1, total)
@@ -0,0 +1,147 @@
+import time
+
+import db
+import stats_db
+from stats_db import USER_STATS_DB
+
+# -----------------------------------------------------------------------------
+# Settlement journal
+# -----------------------------------------------------------------------------
+# Lives in users_datab.db next to the stats it protects. A fixture's journal
+# rows are written in the same transaction that credits its predictors, so
+# "scored" is all-or-nothing: a settlement row exists iff every predictor was
+# credited exactly once. After that the settlement walks through
+#   scored -> announced (final score stored, fixture removed, group told)
+#          -> done      (every predictor DM'd)
+# and each user's row carries a `notified` flag, so a restart resumes only
+# the remaining steps and the remaining DMs.
+
+SCORED = "scored"
+ANNOUNCED = "announced"
+DONE = "done"
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS settlements (
+        fixture_id INTEGER PRIMARY KEY,
+        home_name TEXT,
+        away_name TEXT,
+        home_goals INTEGER NOT NULL,
+        away_goals INTEGER NOT NULL,
+        correct INTEGER NOT NULL,
+        incorrect INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS settlement_users (
+        fixture_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        pred_home INTEGER NOT NULL,
+        pred_away INTEGER NOT NULL,
+        won INTEGER NOT NULL,
+        notified INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (fixture_id, user_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_settlement_users_pending
+        ON settlement_users(fixture_id, user_id) WHERE notified = 0;
+"""
+
+def init_db():
+    """Create the journal tables if they do not exist yet."""
+    conn = db.get_connection(USER_STATS_DB)
+    conn.executescript(SCHEMA)
+    conn.commit()
+
+init_db()
+
+def get_settlement(fixture_id):
+    """
+    Returns the journal row as a dict, or None if the fixture was never scored.
+    """
+    conn = db.get_connection(USER_STATS_DB)
+    row = conn.execute(
+        """
+        SELECT fixture_id, home_name, away_name, home_goals, away_goals,
+               correct, incorrect, state
+          FROM settlements WHERE fixture_id=?
+        """,
+        (int(fixture_id),)
+    ).fetchone()
+    if not row:
+        return None
+    keys = ("fixture_id", "home_name", "away_name", "home_goals", "away_goals",
+            "correct", "incorrect", "state")
+    return dict(zip(keys, row))
+
+def record_scored(fixture_id, home_name, away_name, home_goals, away_goals, results):
+    """
+    Credit every predictor and journal the settlement in one transaction.
+    `results` is a list of (user_id, username, won, pred_home, pred_away).
+    Returns False (and changes nothing) if the fixture was already scored.
+    """
+    fixture_id = int(fixture_id)
+    correct = sum(1 for r in results if r[2])
+    now = int(time.time())
+    with stats_db.ranked_transaction() as (conn, rank_updates):
+        inserted = conn.execute(
+            """
+            INSERT OR IGNORE INTO settlements
+                (fixture_id, home_name, away_name, home_goals, away_goals,
+                 correct, incorrect, state, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (fixture_id, home_name, away_name, home_goals, away_goals,
+             correct, len(results) - correct, SCORED, now, now)
+        ).rowcount
+        if not inserted:
+            return False
+        conn.executemany(
+            "INSERT INTO settlement_users (fixture_id, user_id, pred_home, pred_away, won) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(fixture_id, uid, ph, pa, int(won)) for (uid, _, won, ph, pa) in results]
+        )
+        stats_db.apply_results(conn, rank_updates, [(uid, name, won) for (uid, name, won, _, _) in results])
+    return True
+
+def set_state(fixture_id, state):
+    with db.transaction(USER_STATS_DB) as conn:
+        conn.execute(
+            "UPDATE settlements SET state=?, updated_at=? WHERE fixture_id=?",
+            (state, int(time.time()), int(fixture_id))
+        )
+
+def pending_notifications(fixture_id):
+    """Returns [(user_id, pred_home, pred_away)] not yet DM'd, via the partial index."""
+    conn = db.get_connection(USER_STATS_DB)
+    return conn.execute(
+        "SELECT user_id, pred_home, pred_away FROM settlement_users "
+        "WHERE fixture_id=? AND notified=0",
+        (int(fixture_id),)
+    ).fetchall()
+
+def mark_notified(fixture_id, user_ids):
+    if not user_ids:
+        return
+    with db.transaction(USER_STATS_DB) as conn:
+        conn.executemany(
+            "UPDATE settlement_users SET notified=1 WHERE fixture_id=? AND user_id=?",
+            [(int(fixture_id), uid) for uid in user_ids]
+        )
+
+def finish(fixture_id):
+    """Mark the settlement done and drop its per-user rows."""
+    fixture_id = int(fixture_id)
+    with db.transaction(USER_STATS_DB) as conn:
+        conn.execute("DELETE FROM settlement_users WHERE fixture_id=?", (fixture_id,))
+        conn.execute(
+            "UPDATE settlements SET state=?, updated_at=? WHERE fixture_id=?",
+            (DONE, int(time.time()), fixture_id)
+        )
+
+def open_settlements():
+    """Fixture ids whose settlement has not finished, oldest first."""
+    conn = db.get_connection(USER_STATS_DB)
+    return [r[0] for r in conn.execute(
+        "SELECT fixture_id FROM settlements WHERE state != ? ORDER BY created_at",
+        (DONE,)
+    )]
@@ -0,0 +1,184 @@
+import threading
+from contextlib import contextmanager
+
+import db
+from rank_index import RankIndex
+
+# Database for overall user stats (won / lost / pts).
+USER_STATS_DB = "users_datab.db"
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        won INTEGER DEFAULT 0,
+        lost INTEGER DEFAULT 0,
+        pts INTEGER DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_users_rank ON users(pts DESC, user_id);
+"""
+
+# Leaderboard order (pts DESC, user_id ASC) kept in memory; see rank_index.py.
+RANKS = RankIndex()
+
+# Held by this process's stats writers from the start of their transaction
+# until the index has followed the commit, and by the index build: the index
+# only ever sees committed points, in commit order, and a build cannot miss
+# a commit.
+_rank_lock = threading.Lock()
+
+# SQLite's default limit on bound parameters is 999
+_IN_CHUNK = 900
+
+def init_db():
+    """Create the users stats table if it does not exist yet."""
+    conn = db.get_connection(USER_STATS_DB)
+    conn.executescript(SCHEMA)
+    conn.commit()
+
+init_db()
+
+WIN_POINTS = 5
+
+_UPSERT_RESULT = """
+    INSERT INTO users (user_id, username, won, lost, pts)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        won = won + excluded.won,
+        lost = lost + excluded.lost,
+        pts = pts + excluded.pts,
+        username = excluded.username
+"""
+
+@contextmanager
+def ranked_transaction():
+    """
+    A users_datab.db write transaction that moves RANKS along with it:
+
+        with stats_db.ranked_transaction() as (conn, rank_updates):
+            stats_db.apply_results(conn, rank_updates, results)
+
+    (user_id, pts) pairs collected in `rank_updates` reach the index only
+    after the commit; a rollback leaves the index untouched.
+    """
+    with _rank_lock:
+        rank_updates = []
+        with db.transaction(USER_STATS_DB) as conn:
+            yield conn, rank_updates
+        if RANKS.loaded:
+            for (user_id, pts) in rank_updates:
+                RANKS.set_points(user_id, pts)
+
+def update_user_stats(user_id, username, result_type):
+    """
+    Record a settled prediction for the user. `result_type` is "won" (+1 win,
+    +5 pts) or "lost" (+1 loss). The row is created on first use.
+    """
+    won = 1 if result_type == "won" else 0
+    with ranked_transaction() as (conn, rank_updates):
+        row = conn.execute(
+            _UPSERT_RESULT + " RETURNING pts",
+            (user_id, username, won, 1 - won, WIN_POINTS * won)
+        ).fetchone()
+        rank_updates.append((user_id, row[0]))
+
+def apply_settlement(results):
+    """
+    Record a whole fixture's outcomes in one transaction.
+    `results` is a list of (user_id, username, won) with won a bool; one
+    UPSERT per user is run through executemany.
+    """
+    if not results:
+        return
+    with ranked_transaction() as (conn, rank_updates):
+        apply_results(conn, rank_updates, results)
+
+def apply_results(conn, rank_updates, results):
+    """
+    apply_settlement() inside the caller's open ranked_transaction(), so
+    other writes can commit atomically with it. The new point totals are
+    appended to `rank_updates`.
+    """
+    rows = [
+        (user_id, username, int(won), int(not won), WIN_POINTS * int(won))
+        for (user_id, username, won) in results
+    ]
+    conn.executemany(_UPSERT_RESULT, rows)
+    if RANKS.loaded:
+        # executemany can't RETURN: read the new totals back in chunks.
+        user_ids = [row[0] for row in rows]
+        for i in range(0, len(user_ids), _IN_CHUNK):
+            chunk = user_ids[i:i + _IN_CHUNK]
+            rank_updates.extend(conn.execute(
+                f"SELECT user_id, pts FROM users WHERE user_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ))
+
+def _ensure_rank_index():
+    if RANKS.loaded:
+        return
+    with _rank_lock:
+        if not RANKS.loaded:
+            conn = db.get_connection(USER_STATS_DB)
+            RANKS.load(conn.execute("SELECT user_id, pts FROM users"))
+
+def get_user_stats(user_id):
+    """
+    Returns (won, lost, pts, rank, total_users) for the given user_id.
+    If the user isn't found, returns None.
+    """
+    conn = db.get_connection(USER_STATS_DB)
+    row = conn.execute(
+        "SELECT won, lost, pts FROM users WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    if not row:
+        return None
+    _ensure_rank_index()
+    ranked = RANKS.rank(user_id)
+    if ranked is None:
+        # Row committed by another process after the index was built.
+        RANKS.set_points(user_id, row[2])
+        ranked = RANKS.rank(user_id)
+    rank, total = ranked
+    return (row[0], row[1], row[2], rank, total)
+
+def get_user_rank(user_id):
+    """
+    Returns (pts, rank, total_users) from the in-memory index only (no query
+    once the index is built), or None if the user has no stats yet.
+    """
+    _ensure_rank_index()
+    pts = RANKS.points(user_id)
+    ranked = RANKS.rank(user_id)
+    if pts is None or ranked is None:
+        return None
+    return (pts,) + ranked
+
+def get_top_users(limit):
+    """
+    Returns the first `limit` rows of the leaderboard as
+    (user_id, username, won, lost, pts), ordered pts DESC, user_id ASC.
+    """
+    conn = db.get_connection(USER_STATS_DB)
+    return conn.execute(
+        "SELECT user_id, username, won, lost, pts FROM users "
+        "ORDER BY pts DESC, user_id ASC LIMIT ?",
+        (limit,)
+    ).fetchall()
+
+def get_user_rank_sql(user_id):
+    """
+    Index-backed SQL equivalent of the in-memory rank: (rank, total_users)
+    or None. Used to cross-check RANKS.
+    """
+    conn = db.get_connection(USER_STATS_DB)
+    row = conn.execute("SELECT pts FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    if not row:
+        return None
+    # Two range scans on idx_users_rank (an OR would fall back to a table scan).
+    above = conn.execute("SELECT COUNT(*) FROM users WHERE pts > ?", (row[0],)).fetchone()[0]
+    above += conn.execute(
+        "SELECT COUNT(*) FROM users WHERE pts = ? AND user_id < ?", (row[0], user_id)
+    ).fetchone()[0]
+    total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    return (above + 1, total)
@@ -0,0 +1,89 @@
+"""
+Shared setup for the test suite.
+
+The bot modules open their SQLite and JSON files relative to the working
+directory as soon as they are imported, so the whole session runs in a
+throw-away directory with its own config.json. Tests share those files:
+each one uses its own fixture / user ids, or the fixtures below to start
+from empty tables.
+
+Usage (from the repository or the Footballer folder):
+    python -m pytest -q
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="footballer_tests_"))
+
+ADMIN_ID = 1
+GROUP_ID = -100123
+
+with open("config.json", "w") as f:
+    json.dump({"bot_token": "123:test", "adminids": [ADMIN_ID], "groupid": GROUP_ID, "apikey": ""}, f)
+
+import pytest
+
+import db
+import stats_db
+import settlement_journal
+from rank_index import RankIndex
+
+class FakeBot:
+    """
+    Records every Bot API call instead of sending it. `failures` maps a
+    chat_id to a list of exceptions raised by its next send_message calls.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.answers = []
+        self.failures = {}
+        self._message_ids = iter(range(1, 1_000_000))
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id, text, **kwargs):
+        with self._lock:
+            pending = self.failures.get(chat_id)
+            if pending:
+                raise pending.pop(0)
+            self.sent.append((chat_id, text))
+            return SimpleNamespace(message_id=next(self._message_ids), chat=SimpleNamespace(id=chat_id))
+
+    def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        self.answers.append((callback_query_id, text))
+
+    def callback_query_handler(self, func=None, **kwargs):
+        return lambda handler: handler
+
+    def chats(self):
+        with self._lock:
+            return [chat_id for (chat_id, _) in self.sent]
+
+def wait_until(predicate, timeout=5.0):
+    """Poll `predicate` until it is true; False if `timeout` seconds pass first."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+@pytest.fixture
+def bot():
+    return FakeBot()
+
+@pytest.fixture
+def clean_stats(monkeypatch):
+    """Empty users / settlement tables and a fresh, unloaded rank index."""
+    settlement_journal.init_db()
+    with db.transaction(stats_db.USER_STATS_DB) as conn:
+        conn.execute("DELETE FROM users")
+        conn.execute("DELETE FROM settlements")
+        conn.execute("DELETE FROM settlement_users")
+    monkeypatch.setattr(stats_db, "RANKS", RankIndex())
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+import config_service
+from callback_router import CallbackRouter
+
+from tests.conftest import ADMIN_ID
+
+def _call(data, user_id=7):
+    return SimpleNamespace(id="cb", data=data, from_user=SimpleNamespace(id=user_id))
+
+@pytest.fixture
+def router(bot):
+    router = CallbackRouter(bot)
+    router.admin_check = config_service.is_admin
+    return router
+
+def test_arguments_are_converted(router):
+    seen = []
+
+    @router.route("predict", str, int, int, optional=1)
+    def predict(call, fixture_id, home, away=None):
+        seen.append((fixture_id, home, away))
+
+    router.dispatch(_call("predict:123:2:1"))
+    router.dispatch(_call("predict:123:2"))
+    assert seen == [("123", 2, 1), ("123", 2, None)]
+    assert router.stats()[0]["hits"] == 2
+
+@pytest.mark.parametrize("data", ["predict:123:x:1", "predict:123", "predict:1:2:3:4", "predict"])
+def test_bad_arguments_are_refused(router, bot, data):
+    seen = []
+    router.route("predict", str, int, int, optional=1)(lambda call, *args: seen.append(args))
+
+    router.dispatch(_call(data))
+    assert seen == []
+    assert router.invalid == 1
+    assert bot.answers == [("cb", "❌ Invalid callback data!")]
+
+def test_unknown_action_is_answered(router, bot):
+    router.dispatch(_call("nope:1"))
+    router.dispatch(_call(None))
+    assert router.unrouted == 2
+    assert len(bot.answers) == 2
+
+def test_admin_routes_are_gated(router, bot):
+    seen = []
+    router.route("admin_panel", admin=True)(lambda call: seen.append(call.from_user.id))
+
+    router.dispatch(_call("admin_panel", user_id=7))
+    assert seen == []
+    assert bot.answers == [("cb", "🚫 Unauthorized")]
+    assert router.routes["admin_panel"].denied == 1
+
+    router.dispatch(_call("admin_panel", user_id=ADMIN_ID))
+    assert seen == [ADMIN_ID]
+
+def test_admin_routes_fail_closed_without_check(bot):
+    router = CallbackRouter(bot)
+    seen = []
+    router.route("admin_panel", admin=True)(lambda call: seen.append(call))
+    router.dispatch(_call("admin_panel", user_id=ADMIN_ID))
+    assert seen == []
+
+def test_handler_errors_are_counted_and_raised(router):
+    @router.route("boom")
+    def boom(call):
+        raise KeyError("x")
+
+    with pytest.raises(KeyError):
+        router.dispatch(_call("boom"))
+    assert router.routes["boom"].errors == 1
+    assert router.routes["boom"].hits == 1
+
+def test_duplicate_route_is_rejected(router):
+    router.route("menu")(lambda call: None)
+    with pytest.raises(ValueError):
+        router.route("menu")(lambda call: None)
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+import requests
+from telebot.apihelper import ApiTelegramException
+
+import delivery
+from delivery import TokenBucket, DeliveryEngine, DELIVERED, FAILED, BLOCKED
+
+def _api_error(code, description, retry_after=None):
+    result_json = {"ok": False, "error_code": code, "description": description}
+    if retry_after is not None:
+        result_json["parameters"] = {"retry_after": retry_after}
+    return ApiTelegramException("sendMessage", None, result_json)
+
+@pytest.fixture
+def engine(bot, monkeypatch):
+    # Per-chat limits would make retries to the same chat wait a second each
+    monkeypatch.setattr(delivery, "PRIVATE_CHAT_RATE", 1000.0)
+    return DeliveryEngine(bot, workers=2, global_rate=1000)
+
+def test_bucket_hands_out_capacity_then_refills():
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    bucket.acquire()
+    bucket.acquire()
+    assert time.monotonic() - start < 0.03
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.04
+
+def test_bucket_pause_holds_tokens():
+    bucket = TokenBucket(rate=1000)
+    bucket.pause(0.2)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.19
+
+def test_429_pauses_and_retries(engine, bot):
+    bot.failures[5] = [_api_error(429, "Too Many Requests", retry_after=0.2)]
+    start = time.monotonic()
+    assert engine.deliver(5, "hi") == DELIVERED
+    assert time.monotonic() - start >= 0.19
+    assert bot.sent == [(5, "hi")]
+
+def test_429_gives_up_after_max_attempts(engine, bot):
+    bot.failures[5] = [_api_error(429, "Too Many Requests", retry_after=0)] * delivery.MAX_ATTEMPTS
+    assert engine.deliver(5, "hi") == FAILED
+    assert bot.sent == []
+
+def test_403_is_blocked_and_not_retried(engine, bot):
+    bot.failures[6] = [_api_error(403, "Forbidden: bot was blocked by the user")]
+    assert engine.deliver(6, "hi") == BLOCKED
+    assert engine.deliver(6, "again") == DELIVERED
+    assert bot.sent == [(6, "again")]
+
+def test_read_timeout_is_not_resent(engine, bot):
+    bot.failures[7] = [requests.exceptions.ReadTimeout("slow")]
+    assert engine.deliver(7, "hi") == FAILED
+    assert bot.sent == []
+
+def test_connection_error_is_retried(engine, bot):
+    bot.failures[8] = [requests.exceptions.ConnectionError("reset")]
+    assert engine.deliver(8, "hi") == DELIVERED
+
+def test_send_many_reports_every_outcome(engine, bot):
+    bot.failures[2] = [_api_error(403, "Forbidden")]
+    bot.failures[3] = [_api_error(400, "Bad Request: chat not found")]
+    report = engine.send_many([(chat_id, "x", {}) for chat_id in (1, 2, 3, 4)])
+    assert (report.delivered, report.blocked, report.failed) == (2, 1, 1)
+    assert sorted(bot.chats()) == [1, 4]
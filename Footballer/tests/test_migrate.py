@@ -0,0 +1,63 @@
+import os
+import json
+import shutil
+
+import pytest
+
+import db
+import migrate
+import predictions_db
+from predictions_db import DB_FILE
+
+@pytest.fixture
+def legacy_data():
+    """A legacy fixture table, a fixtures/<id>.json file and a users/<id>.json profile."""
+    with db.transaction(DB_FILE) as conn:
+        conn.execute('CREATE TABLE "fixture_4001" (user_id INTEGER, prediction TEXT, username TEXT)')
+        conn.executemany(
+            'INSERT INTO "fixture_4001" VALUES (?, ?, ?)',
+            [(61, "2 - 1", "u61"), (62, "0-0", "u62"), (63, "bad", "u63")]
+        )
+    os.makedirs(migrate.FIXTURES_DIR)
+    with open(os.path.join(migrate.FIXTURES_DIR, "4002.json"), "w") as f:
+        json.dump({"match": "C vs D", "predictions": {"61": "1 - 3", "64": "2 - 2"}}, f)
+    os.makedirs(migrate.USERS_DIR)
+    with open(os.path.join(migrate.USERS_DIR, "61.json"), "w") as f:
+        json.dump({"username": "u61", "predictions": {
+            "4001": {"prediction": "2 - 1", "match": "A vs B", "final_score": "2 - 1"},
+            "4003": {"prediction": "1 - 0", "match": "E vs F"},
+        }}, f)
+    yield
+    shutil.rmtree(migrate.FIXTURES_DIR)
+    shutil.rmtree(migrate.USERS_DIR)
+
+def _snapshot():
+    conn = db.get_connection(DB_FILE)
+    predictions = conn.execute(
+        "SELECT fixture_id, user_id, home, away, username, match, final_home, final_away "
+        "FROM predictions WHERE fixture_id BETWEEN 4001 AND 4003 ORDER BY fixture_id, user_id"
+    ).fetchall()
+    counts = [predictions_db.get_outcome_counts(fid) for fid in (4001, 4002, 4003)]
+    return predictions, counts
+
+def test_migrate_imports_everything_once(legacy_data):
+    migrate.migrate()
+    predictions, counts = _snapshot()
+    assert predictions == [
+        (4001, 61, 2, 1, "u61", "A vs B", 2, 1),
+        (4001, 62, 0, 0, "u62", None, None, None),
+        (4002, 61, 1, 3, "u61", "C vs D", None, None),
+        (4002, 64, 2, 2, None, "C vs D", None, None),
+        (4003, 61, 1, 0, "u61", "E vs F", None, None),
+    ]
+    assert counts == [
+        {"home": 1, "away": 0, "draw": 1},
+        {"home": 0, "away": 1, "draw": 1},
+        {"home": 1, "away": 0, "draw": 0},
+    ]
+    conn = db.get_connection(DB_FILE)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'fixture_4001'").fetchone() is None
+
+    # Re-running it is harmless
+    migrate.migrate()
+    assert _snapshot() == (predictions, counts)
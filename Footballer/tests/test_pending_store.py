@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pending_store
+from pending_store import PendingStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pending_store, "time", SimpleNamespace(monotonic=clock))
+    store = PendingStore(ttl=60, max_size=10)
+
+    store.set_home_score("a", 2)
+    clock.now += 59
+    assert store.home_score("a") == 2   # a read does not extend the entry
+
+    store.start("b")
+    clock.now += 1
+    assert store.home_score("a") is None
+    assert store.expired == 1
+    assert len(store) == 1
+
+    # Touching an entry restarts its TTL
+    clock.now += 50
+    store.set_home_score("b", 1)
+    clock.now += 50
+    assert store.home_score("b") == 1
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pending_store, "time", SimpleNamespace(monotonic=clock))
+    store = PendingStore(ttl=60, max_size=3)
+    for key in ("a", "b", "c"):
+        store.start(key)
+        clock.now += 1
+    store.set_home_score("a", 4)   # "a" is now the most recently used
+    store.start("d")
+
+    assert len(store) == 3
+    assert store.evicted == 1
+    assert store.home_score("a") == 4
+    assert "b" not in store._entries
+
+def test_pop_and_restart():
+    store = PendingStore()
+    store.set_home_score("a", 3)
+    store.start("a")
+    assert store.home_score("a") is None
+    store.set_home_score("a", 1)
+    store.pop("a")
+    store.pop("a")
+    assert len(store) == 0
@@ -0,0 +1,32 @@
+import predictions_db
+import userhandler
+
+FIXTURE = 2001
+
+def test_store_prediction_moves_counters_on_replace():
+    userhandler.store_prediction(11, FIXTURE, "A vs B", 2, 1, "u11")
+    userhandler.store_prediction(12, FIXTURE, "A vs B", 1, 1, "u12")
+    assert predictions_db.get_outcome_counts(FIXTURE) == {"home": 1, "away": 0, "draw": 1}
+    assert predictions_db.count_predictions(FIXTURE) == 2
+
+    # Changing 2-1 to 0-3: the old outcome and score are taken out first
+    userhandler.store_prediction(11, FIXTURE, "A vs B", 0, 3, "u11")
+    assert predictions_db.get_outcome_counts(FIXTURE) == {"home": 0, "away": 1, "draw": 1}
+    assert predictions_db.count_predictions(FIXTURE) == 2
+    assert predictions_db.count_exact_score(FIXTURE, 2, 1) == 0
+    assert predictions_db.get_score_histogram(FIXTURE) == {(0, 3): 1, (1, 1): 1}
+
+    # Storing the same prediction again changes nothing
+    userhandler.store_prediction(12, FIXTURE, "A vs B", 1, 1, "u12")
+    assert predictions_db.get_outcome_counts(FIXTURE) == {"home": 0, "away": 1, "draw": 1}
+
+def test_counters_match_rebuild():
+    for uid, (home, away) in enumerate([(1, 0), (0, 0), (2, 2), (0, 1), (1, 0)], start=20):
+        predictions_db.store_prediction(FIXTURE + 1, uid, home, away, f"u{uid}")
+    predictions_db.store_prediction(FIXTURE + 1, 20, 3, 3, "u20")
+    counts = predictions_db.get_outcome_counts(FIXTURE + 1)
+    histogram = predictions_db.get_score_histogram(FIXTURE + 1)
+
+    predictions_db.rebuild_counters()
+    assert predictions_db.get_outcome_counts(FIXTURE + 1) == counts == {"home": 1, "away": 1, "draw": 3}
+    assert predictions_db.get_score_histogram(FIXTURE + 1) == histogram
@@ -0,0 +1,69 @@
+import random
+
+import stats_db
+from rank_index import FenwickTree, RankIndex
+
+def test_fenwick_prefix_sums_match_brute_force():
+    rng = random.Random(1)
+    values = [0] * 100
+    tree = FenwickTree(len(values))
+    for _ in range(500):
+        i, delta = rng.randrange(len(values)), rng.randint(-3, 5)
+        values[i] += delta
+        tree.add(i, delta)
+    for i in range(len(values)):
+        assert tree.prefix_sum(i) == sum(values[:i + 1])
+    # Past the end clamps to the total
+    assert tree.prefix_sum(500) == sum(values)
+
+def test_rank_orders_by_points_then_user_id():
+    index = RankIndex()
+    index.load([(10, 5), (3, 5), (7, 20), (8, 0)])
+    assert index.rank(7) == (1, 4)
+    assert index.rank(3) == (2, 4)
+    assert index.rank(10) == (3, 4)
+    assert index.rank(8) == (4, 4)
+    assert index.rank(99) is None
+
+    # Moving past the initial tree size rebuilds it
+    index.set_points(8, 500)
+    assert index.rank(8) == (1, 4)
+    assert index.rank(7) == (2, 4)
+
+def test_rank_matches_sql(clean_stats):
+    rng = random.Random(7)
+    user_ids = list(range(1, 301))
+    for _ in range(3):
+        stats_db.apply_settlement([(uid, f"user{uid}", rng.random() < 0.3) for uid in user_ids])
+    # Built from the table, then kept current by the writes below
+    stats_db._ensure_rank_index()
+    for uid in rng.sample(user_ids, 50):
+        stats_db.update_user_stats(uid, f"user{uid}", "won")
+    stats_db.update_user_stats(1000, "newcomer", "lost")
+
+    for uid in user_ids + [1000]:
+        pts, rank, total = stats_db.get_user_rank(uid)
+        assert (rank, total) == stats_db.get_user_rank_sql(uid)
+        assert stats_db.get_user_stats(uid)[2:] == (pts, rank, total)
+
+def test_top_users_agree_with_index(clean_stats):
+    rng = random.Random(11)
+    stats_db.apply_settlement([(uid, f"user{uid}", rng.random() < 0.5) for uid in range(1, 101)])
+    stats_db.apply_settlement([(uid, f"user{uid}", rng.random() < 0.5) for uid in range(1, 101)])
+
+    top = stats_db.get_top_users(10)
+    assert [stats_db.get_user_rank(row[0])[1] for row in top] == list(range(1, 11))
+    assert [row[4] for row in top] == sorted((row[4] for row in top), reverse=True)
+
+def test_rolled_back_write_leaves_index_untouched(clean_stats):
+    stats_db.update_user_stats(1, "a", "won")
+    stats_db._ensure_rank_index()
+    try:
+        with stats_db.ranked_transaction() as (conn, rank_updates):
+            stats_db.apply_results(conn, rank_updates, [(1, "a", True), (2, "b", True)])
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert stats_db.get_user_rank(1) == (5, 1, 1)
+    assert stats_db.get_user_rank(2) is None
+    assert stats_db.get_user_rank_sql(2) is None
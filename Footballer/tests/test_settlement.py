@@ -0,0 +1,62 @@
+import fixed_matches
+import match_finished
+import predictions_db
+import settlement_journal
+import stats_db
+from settlement_journal import SCORED, ANNOUNCED, DONE
+
+from tests.conftest import GROUP_ID, wait_until
+
+def _set_up_fixture(fixture_id, predictions):
+    fixed_matches.add_fixed_match({
+        "fixture_id": str(fixture_id),
+        "home": {"id": 1, "name": "Home"},
+        "away": {"id": 2, "name": "Away"},
+        "timestamp": 1_700_000_000 + fixture_id,
+    })
+    for user_id, (home, away) in predictions.items():
+        predictions_db.store_prediction(fixture_id, user_id, home, away, f"user{user_id}")
+
+def _scored(fixture_id, predictions, home_goals, away_goals):
+    """Journal the fixture as scored, as if the process died right after."""
+    _set_up_fixture(fixture_id, predictions)
+    match_finished._score_fixture(
+        str(fixture_id), fixed_matches.get_fixed_match(fixture_id), home_goals, away_goals
+    )
+    assert settlement_journal.get_settlement(fixture_id)["state"] == SCORED
+
+def _settled(fixture_id):
+    return settlement_journal.get_settlement(fixture_id)["state"] == DONE
+
+def test_resume_from_scored(bot, clean_stats):
+    _scored(3001, {31: (2, 1), 32: (0, 0)}, 2, 1)
+
+    match_finished.resume_settlements(bot)
+    assert wait_until(lambda: _settled(3001))
+
+    # The group is told once, every predictor is DM'd once
+    assert bot.chats().count(GROUP_ID) == 1
+    assert sorted(c for c in bot.chats() if c != GROUP_ID) == [31, 32]
+    assert not fixed_matches.is_fixture_set(3001)
+    assert 3001 not in settlement_journal.open_settlements()
+    assert stats_db.get_user_stats(31)[:3] == (1, 0, stats_db.WIN_POINTS)
+    assert stats_db.get_user_stats(32)[:3] == (0, 1, 0)
+
+def test_resume_from_announced_only_sends_remaining_dms(bot, clean_stats):
+    _scored(3002, {41: (1, 0), 42: (1, 0), 43: (0, 2)}, 1, 0)
+    settlement_journal.set_state(3002, ANNOUNCED)
+    settlement_journal.mark_notified(3002, [41])
+
+    match_finished.resume_settlements(bot)
+    assert wait_until(lambda: _settled(3002))
+    assert sorted(bot.chats()) == [42, 43]
+
+def test_finished_fixture_is_never_credited_twice(bot, clean_stats):
+    _set_up_fixture(3003, {51: (3, 3)})
+    job = match_finished.process_finished_match(bot, "3003", 3, 3)
+    assert job.wait(5)
+    assert wait_until(lambda: _settled(3003))
+
+    assert match_finished.process_finished_match(bot, "3003", 3, 3) is None
+    assert stats_db.get_user_stats(51)[:3] == (1, 0, stats_db.WIN_POINTS)
+    assert bot.chats().count(51) == 1
@@ -1,53 +1,43 @@
-import os
-import json
-import sqlite3
 import io
-from telebot import types
 
-USER_STATS_DB = "users_datab.db"  # Database for overall user stats
-USERS_DIR = "users"               # Folder with user JSON files
-DB_FILE = "predictions.db"        # Predictions DB (fixture_<id> tables)
+import stats_db
+import user_store
+import markup_cache
+import leaderboard
+from callback_router import get_router
 
 def register_user_extra_handlers(bot):
     """
     Register callback handlers for additional user features:
-      - My Fixtures: Show upcoming/in-progress matches from user's JSON.
+      - My Fixtures: Show upcoming/in-progress matches from the user store.
       - Profile: Show user's overall stats and provide a Download Predictions button.
       - Administration: Provide help/contact info.
+      - Leaderboard: Paginated standings, in DMs and in the group (/leaderboard).
       - FAQ: Describe how the bot works.
     """
+    router = get_router(bot)
 
-    @bot.callback_query_handler(func=lambda call: call.data == "user_myfixtures")
+    @router.route("user_myfixtures")
     def user_myfixtures_callback(call):
         user_id = call.from_user.id
-        user_file = os.path.join(USERS_DIR, f"{user_id}.json")
         lines = []
-        if not os.path.exists(user_file):
-            lines.append("⚠️ You have no recorded predictions yet.")
-        else:
-            try:
-                with open(user_file, "r") as f:
-                    user_data = json.load(f)
-                predictions = user_data.get("predictions", {})
-                upcoming = []
-                for fx_id, fx_info in predictions.items():
-                    # Consider fixtures without final_score as upcoming/in-progress
-                    if "final_score" not in fx_info:
-                        match_name = fx_info.get("match", "Unknown Match")
-                        user_pred = fx_info.get("prediction", "?-?")
-                        upcoming.append((fx_id, match_name, user_pred))
+        try:
+            predictions = user_store.get_user_predictions(user_id)
+            if not predictions:
+                lines.append("⚠️ You have no recorded predictions yet.")
+            else:
+                # Consider fixtures without a final score as upcoming/in-progress
+                upcoming = [p for p in predictions if p[4] is None]
                 if not upcoming:
                     lines.append("✅ You have no upcoming or in-progress matches.")
                 else:
                     lines.append("<b>Your Upcoming/In-Progress Fixtures</b>\n")
-                    for (fid, mname, pred) in upcoming:
-                        lines.append(f"• <b>{mname}</b> | Your Prediction: <b>{pred}</b> (FixtureID: {fid})")
-            except:
-                lines.append("⚠️ Unable to read your predictions file.")
+                    for (fid, mname, home, away, _, _) in upcoming:
+                        lines.append(f"• <b>{mname or 'Unknown Match'}</b> | Your Prediction: <b>{home} - {away}</b> (FixtureID: {fid})")
+        except:
+            lines.append("⚠️ Unable to read your predictions.")
         text = "\n".join(lines)
-        markup = types.InlineKeyboardMarkup()
-        btn_back = types.InlineKeyboardButton("🔙 Back", callback_data="user_main_menu")
-        markup.add(btn_back)
+        markup = markup_cache.back_button("user_main_menu")
         try:
             bot.edit_message_text(chat_id=call.message.chat.id,
                                   message_id=call.message.message_id,
@@ -59,10 +49,10 @@ def register_user_extra_handlers(bot):
         except:
             pass
 
-    @bot.callback_query_handler(func=lambda call: call.data == "user_profile")
+    @router.route("user_profile")
     def user_profile_callback(call):
         user_id = call.from_user.id
-        stats = _get_user_stats(user_id)
+        stats = stats_db.get_user_stats(user_id)
         if stats is None:
             text = (
                 "👤 <b>Your Profile</b>\n\n"
@@ -78,11 +68,7 @@ def register_user_extra_handlers(bot):
                 f"• <b>Losses:</b> {lost}\n"
                 f"• <b>Rank:</b> {rank} / {total_users}"
             )
-        markup = types.InlineKeyboardMarkup()
-        btn_download = types.InlineKeyboardButton("⬇️ Download Predictions", callback_data="download_user_predictions")
-        btn_back = types.InlineKeyboardButton("🔙 Back", callback_data="user_main_menu")
-        markup.row(btn_download)
-        markup.add(btn_back)
+        markup = markup_cache.profile_menu()
         try:
             bot.edit_message_text(chat_id=call.message.chat.id,
                                   message_id=call.message.message_id,
@@ -94,35 +80,31 @@ def register_user_extra_handlers(bot):
         except:
             pass
 
-    @bot.callback_query_handler(func=lambda call: call.data == "download_user_predictions")
+    @router.route("download_user_predictions")
     def download_user_predictions_callback(call):
         user_id = call.from_user.id
-        user_file = os.path.join(USERS_DIR, f"{user_id}.json")
-        if not os.path.exists(user_file):
+        try:
+            preds = user_store.get_user_predictions(user_id)
+        except:
+            bot.send_message(call.message.chat.id, "⚠️ Error reading your predictions.")
+            return
+        if not preds:
             try:
                 bot.answer_callback_query(call.id)
             except:
                 pass
             bot.send_message(call.message.chat.id, "⚠️ You have no predictions to download.")
             return
-        try:
-            with open(user_file, "r") as f:
-                user_data = json.load(f)
-        except:
-            bot.send_message(call.message.chat.id, "⚠️ Error reading your predictions file.")
-            return
-        preds = user_data.get("predictions", {})
         lines = []
         lines.append("Your Full Predictions:\n")
-        for fid, info in preds.items():
-            match_name = info.get("match", "Unknown")
-            user_pred = info.get("prediction", "?-?")
-            final_score = info.get("final_score")
-            if final_score:
-                comment = _compare_prediction(user_pred, final_score)
+        for (fid, match_name, home, away, final_home, final_away) in preds:
+            match_name = match_name or "Unknown"
+            user_pred = f"{home} - {away}"
+            if final_home is not None:
+                comment = "WON" if (home, away) == (final_home, final_away) else "LOST"
                 lines.append(f"Fixture {fid}: {match_name}\n"
                              f"  Your Prediction: {user_pred}\n"
-                             f"  Final Score: {final_score}\n"
+                             f"  Final Score: {final_home} - {final_away}\n"
                              f"  Result: {comment}\n")
             else:
                 lines.append(f"Fixture {fid}: {match_name}\n"
@@ -142,16 +124,50 @@ def register_user_extra_handlers(bot):
             bot.send_message(call.message.chat.id, f"⚠️ Could not send file: {e}")
         _return_to_main_menu(bot, call)
 
-    @bot.callback_query_handler(func=lambda call: call.data == "user_administration")
+    def _show_leaderboard_page(call, page, entry):
+        private = call.message.chat.type == "private"
+        text, page, pages = leaderboard.get_page(page)
+        if private:
+            text += leaderboard.user_footer(call.from_user.id)
+        markup = leaderboard.build_markup(page, pages, private=private)
+        try:
+            bot.edit_message_text(chat_id=call.message.chat.id,
+                                  message_id=call.message.message_id,
+                                  text=text, parse_mode="HTML", reply_markup=markup)
+        except:
+            # Also raised when the page is unchanged ("message is not modified")
+            if entry:
+                bot.send_message(call.message.chat.id, text, parse_mode="HTML", reply_markup=markup)
+        try:
+            bot.answer_callback_query(call.id)
+        except:
+            pass
+
+    @router.route("user_leaderboard")
+    def user_leaderboard_callback(call):
+        _show_leaderboard_page(call, 1, entry=True)
+
+    @router.route(leaderboard.CALLBACK_ACTION, int)
+    def leaderboard_page_callback(call, page):
+        _show_leaderboard_page(call, page, entry=False)
+
+    @bot.message_handler(commands=["leaderboard"])
+    def leaderboard_command(message):
+        private = message.chat.type == "private"
+        text, page, pages = leaderboard.get_page(1)
+        if private:
+            text += leaderboard.user_footer(message.from_user.id)
+        markup = leaderboard.build_markup(page, pages, private=private)
+        bot.send_message(message.chat.id, text, parse_mode="HTML", reply_markup=markup)
+
+    @router.route("user_administration")
     def user_administration_callback(call):
         text = (
             "🔧 <b>Administration / Help</b>\n\n"
             "If you have any queries or need assistance, please contact our admin at @YourAdmin.\n"
             "We're here to help and keep the game running smoothly!"
         )
-        markup = types.InlineKeyboardMarkup()
-        btn_back = types.InlineKeyboardButton("🔙 Back", callback_data="user_main_menu")
-        markup.add(btn_back)
+        markup = markup_cache.back_button("user_main_menu")
         try:
             bot.edit_message_text(chat_id=call.message.chat.id,
                                   message_id=call.message.message_id,
@@ -163,20 +179,19 @@ def register_user_extra_handlers(bot):
         except:
             pass
 
-    @bot.callback_query_handler(func=lambda call: call.data == "user_faq")
+    @router.route("user_faq")
     def user_faq_callback(call):
         text = (
             "<b>❓ FAQ - How It Works</b>\n\n"
             "1. <b>Predicting Matches:</b> Tap 'Play' and select a fixture to predict its score.\n\n"
             "2. <b>Viewing Fixtures:</b> Use 'My Fixtures' to see your upcoming or in-progress matches.\n\n"
             "3. <b>Your Profile:</b> View your overall stats (points, wins, losses, rank) and download your predictions.\n\n"
-            "4. <b>Live Updates:</b> You will receive live score updates both via DM and in the group chat.\n\n"
-            "5. <b>Match Results:</b> Once a match finishes, you'll get a final result along with your performance stats.\n\n"
+            "4. <b>Leaderboard:</b> See the top players from the menu, or send /leaderboard in the group.\n\n"
+            "5. <b>Live Updates:</b> You will receive live score updates both via DM and in the group chat.\n\n"
+            "6. <b>Match Results:</b> Once a match finishes, you'll get a final result along with your performance stats.\n\n"
             "Need more help? Contact our admin at @YourAdmin."
         )
-        markup = types.InlineKeyboardMarkup()
-        btn_back = types.InlineKeyboardButton("🔙 Back", callback_data="user_main_menu")
-        markup.add(btn_back)
+        markup = markup_cache.back_button("user_main_menu")
         try:
             bot.edit_message_text(chat_id=call.message.chat.id,
                                   message_id=call.message.message_id,
@@ -197,80 +212,15 @@ def _return_to_main_menu(bot, call):
     except:
         pass
     user_id = call.from_user.id
-    user_file = os.path.join(USERS_DIR, f"{user_id}.json")
-    username = "Player"
-    if os.path.exists(user_file):
-        try:
-            with open(user_file, "r") as f:
-                data = json.load(f)
-            username = data.get("username", "Player")
-        except:
-            pass
+    username = user_store.get_username(user_id) or "Player"
     text = (
         f"👋 Hey {username}! Welcome back to <b>Super Fantasy Football</b> ⚽\n\n"
         "What would you like to do next?"
     )
-    markup = types.InlineKeyboardMarkup()
-    btn_play = types.InlineKeyboardButton("🎮 Play", callback_data="user_play")
-    btn_myfixtures = types.InlineKeyboardButton("📋 My Fixtures", callback_data="user_myfixtures")
-    btn_profile = types.InlineKeyboardButton("👤 Profile", callback_data="user_profile")
-    btn_admin = types.InlineKeyboardButton("🔧 Administration", callback_data="user_administration")
-    btn_faq = types.InlineKeyboardButton("❓ FAQ", callback_data="user_faq")
-    markup.row(btn_play, btn_myfixtures)
-    markup.row(btn_profile, btn_admin)
-    markup.add(btn_faq)
+    markup = markup_cache.main_menu()
     try:
         bot.edit_message_text(chat_id=call.message.chat.id,
                               message_id=call.message.message_id,
                               text=text, parse_mode="HTML", reply_markup=markup)
     except:
         bot.send_message(call.message.chat.id, text, parse_mode="HTML", reply_markup=markup)
-
-def _get_user_stats(user_id):
-    """
-    Returns (won, lost, pts, rank, total_users) for the given user_id from the users table in users_datab.db.
-    If the user isn't found, returns None.
-    """
-    db_path = USER_STATS_DB
-    if not os.path.exists(db_path):
-        return None
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-    if not c.fetchone():
-        conn.close()
-        return None
-    c.execute("SELECT user_id, won, lost, pts FROM users")
-    all_rows = c.fetchall()
-    if not all_rows:
-        conn.close()
-        return None
-    sorted_data = sorted(all_rows, key=lambda x: (-x[3], x[0]))  # sort by pts DESC, then user_id ASC
-    rank = 1
-    found = None
-    for row in sorted_data:
-        if row[0] == user_id:
-            found = (row[1], row[2], row[3], rank, len(sorted_data))
-            break
-        rank += 1
-    conn.close()
-    return found
-
-def _compare_prediction(pred_str, final_str):
-    """
-    Compares the user's prediction and the final score.
-    Returns "WON" if they match exactly, otherwise "LOST".
-    """
-    try:
-        p = pred_str.replace(" ", "").split("-")
-        p_home = int(p[0])
-        p_away = int(p[1])
-    except:
-        return "Invalid Prediction"
-    try:
-        f = final_str.replace(" ", "").split("-")
-        f_home = int(f[0])
-        f_away = int(f[1])
-    except:
-        return "Invalid Final Score"
-    return "WON" if (p_home == f_home and p_away == f_away) else "LOST"
@@ -0,0 +1,125 @@
+import time
+
+import db
+from predictions_db import DB_FILE
+
+# -----------------------------------------------------------------------------
+# User store
+# -----------------------------------------------------------------------------
+# Replaces the per-user users/<id>.json files. A user's profile is one row in
+# `profiles`; their per-fixture history is their rows in `predictions`
+# (indexed on user_id), which also carry the match name and final score.
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS profiles (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+"""
+
+def init_db():
+    """Create the profiles table if it does not exist yet."""
+    conn = db.get_connection(DB_FILE)
+    conn.executescript(SCHEMA)
+    conn.commit()
+
+init_db()
+
+# ---------------------------
+# Profiles
+# ---------------------------
+def upsert_user(user_id, username):
+    """Create the user's profile, or refresh their username."""
+    now = int(time.time())
+    with db.transaction(DB_FILE) as conn:
+        conn.execute(
+            """
+            INSERT INTO profiles (user_id, username, created_at, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                username = excluded.username,
+                updated_at = excluded.updated_at
+            """,
+            (int(user_id), username, now, now)
+        )
+
+def get_username(user_id):
+    """Return the stored username, or None if the user is unknown."""
+    conn = db.get_connection(DB_FILE)
+    row = conn.execute(
+        "SELECT username FROM profiles WHERE user_id=?", (int(user_id),)
+    ).fetchone()
+    return row[0] if row else None
+
+def count_users():
+    conn = db.get_connection(DB_FILE)
+    (cnt,) = conn.execute("SELECT COUNT(*) FROM profiles").fetchone()
+    return cnt
+
+def all_user_ids():
+    conn = db.get_connection(DB_FILE)
+    return [r[0] for r in conn.execute("SELECT user_id FROM profiles")]
+
+# ---------------------------
+# Prediction history
+# ---------------------------
+def has_predicted(user_id, fixture_id):
+    """True if the user already has a prediction for this fixture."""
+    conn = db.get_connection(DB_FILE)
+    row = conn.execute(
+        "SELECT 1 FROM predictions WHERE fixture_id=? AND user_id=?",
+        (int(fixture_id), int(user_id))
+    ).fetchone()
+    return row is not None
+
+def predicted_fixture_ids(user_id, fixture_ids):
+    """
+    Return the subset of `fixture_ids` the user has already predicted, as a
+    set of strings, using a single indexed query.
+    """
+    ids = [int(f) for f in fixture_ids]
+    if not ids:
+        return set()
+    placeholders = ",".join("?" * len(ids))
+    conn = db.get_connection(DB_FILE)
+    rows = conn.execute(
+        f"SELECT fixture_id FROM predictions WHERE user_id=? AND fixture_id IN ({placeholders})",
+        [int(user_id)] + ids
+    )
+    return {str(r[0]) for r in rows}
+
+def get_user_predictions(user_id):
+    """
+    Return the user's predictions, oldest first, as tuples:
+    (fixture_id, match, home, away, final_home, final_away).
+    final_home/final_away are None until the match is settled.
+    """
+    conn = db.get_connection(DB_FILE)
+    return conn.execute(
+        """
+        SELECT fixture_id, match, home, away, final_home, final_away
+          FROM predictions
+         WHERE user_id=?
+         ORDER BY created_at, fixture_id
+        """,
+        (int(user_id),)
+    ).fetchall()
+
+def get_fixture_predictors(fixture_id):
+    """
+    Return every prediction on the fixture as (user_id, username, home, away),
+    with the username from the profile (falling back to the one stored on the
+    prediction), in a single query.
+    """
+    conn = db.get_connection(DB_FILE)
+    return conn.execute(
+        """
+        SELECT p.user_id, COALESCE(u.username, p.username), p.home, p.away
+          FROM predictions p
+          LEFT JOIN profiles u ON u.user_id = p.user_id
+         WHERE p.fixture_id=?
+        """,
+        (int(fixture_id),)
+    ).fetchall()
@@ -0,0 +1,223 @@
+import json
+import queue
+import signal
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from telebot import types
+
+# -----------------------------------------------------------------------------
+# Webhook ingestion
+# -----------------------------------------------------------------------------
+# Telegram POSTs each update to an embedded HTTP server. The request thread
+# only validates the secret and enqueues the raw body; a fixed pool of
+# workers decodes and dispatches updates to the registered handlers. When
+# the queue is full the server answers 503 + Retry-After, so Telegram holds
+# and re-sends the update instead of us buffering without bound. On
+# SIGINT/SIGTERM the server starts answering 503 (Telegram re-sends those
+# updates later), closes the listener, waits for requests already past the
+# check to enqueue, and only then drains: the workers finish what is queued
+# (up to DRAIN_TIMEOUT) and the process exits.
+#
+# Enable with "ingestion": "webhook" in config.json (threaded runtime):
+#   "webhook": {
+#       "url": "https://example.com/bot",   (omit to skip setWebhook, e.g. behind
+#                                             a proxy or with the fake sender)
+#       "listen": "0.0.0.0", "port": 8443, "path": "/bot",
+#       "secret_token": "...", "workers": 8, "queue_size": 1000
+#   }
+
+DEFAULT_LISTEN = "0.0.0.0"
+DEFAULT_PORT = 8443
+DEFAULT_PATH = "/bot"
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 1000
+MAX_BODY_BYTES = 1 << 20   # Telegram updates are far smaller
+RETRY_AFTER = 1            # seconds Telegram should wait when we're saturated
+DRAIN_TIMEOUT = 30         # seconds to finish queued updates on shutdown
+
+_STOP = object()
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128   # listen backlog; the default 5 drops bursts
+
+class WebhookServer:
+    def __init__(self, bot, listen=DEFAULT_LISTEN, port=DEFAULT_PORT, path=DEFAULT_PATH,
+                 secret_token=None, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.received = 0
+        self.rejected = 0      # answered 503 because the queue was full
+        self.processed = 0
+        self.errors = 0
+        self._stats_lock = threading.Lock()
+        self._closing = False
+        self._inflight = 0             # POSTs admitted but not yet enqueued
+        self._admit = threading.Condition()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"webhook-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        self.httpd = _HTTPServer((listen, port), self._handler_class())
+
+    # ---------------------------
+    # HTTP side
+    # ---------------------------
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != server.path:
+                    return self._reply(404)
+                if server.secret_token and \
+                        self.headers.get("X-Telegram-Bot-Api-Secret-Token") != server.secret_token:
+                    return self._reply(403)
+                length = int(self.headers.get("Content-Length") or 0)
+                if length <= 0 or length > MAX_BODY_BYTES:
+                    return self._reply(400)
+                body = self.rfile.read(length)
+                with server._admit:
+                    closing = server._closing
+                    if not closing:
+                        server._inflight += 1
+                if closing:
+                    return self._reply(503, retry_after=RETRY_AFTER)
+                try:
+                    server.queue.put_nowait(body)
+                except queue.Full:
+                    with server._stats_lock:
+                        server.rejected += 1
+                    return self._reply(503, retry_after=RETRY_AFTER)
+                finally:
+                    with server._admit:
+                        server._inflight -= 1
+                        server._admit.notify_all()
+                with server._stats_lock:
+                    server.received += 1
+                self._reply(200)
+
+            def do_GET(self):
+                # Health check: queue depth and counters
+                if self.path != server.path + "/health":
+                    return self._reply(404)
+                body = json.dumps(server.stats()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _reply(self, status, retry_after=None):
+                self.send_response(status)
+                if retry_after:
+                    self.send_header("Retry-After", str(retry_after))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    # ---------------------------
+    # Worker side
+    # ---------------------------
+    def _worker(self):
+        while True:
+            body = self.queue.get()
+            try:
+                if body is _STOP:
+                    return
+                update = types.Update.de_json(body.decode("utf-8"))
+                self.bot.process_new_updates([update])
+                with self._stats_lock:
+                    self.processed += 1
+            except Exception as e:
+                with self._stats_lock:
+                    self.errors += 1
+                print(f"[webhook WARNING] Update failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "received": self.received,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "errors": self.errors,
+                "queued": self.queue.qsize(),
+            }
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    def serve_forever(self):
+        for w in self._workers:
+            w.start()
+        self.httpd.serve_forever()
+
+    def shutdown(self, timeout=DRAIN_TIMEOUT):
+        """Stop accepting, drain queued updates, then stop the workers."""
+        with self._admit:
+            self._closing = True
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        deadline = time.monotonic() + timeout
+        # Handler threads are daemons and not tracked by the server: wait for
+        # the admitted ones to enqueue, so the drain below sees their updates.
+        with self._admit:
+            if not self._admit.wait_for(lambda: self._inflight == 0, timeout):
+                print(f"[webhook WARNING] {self._inflight} request(s) still in flight at shutdown")
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        left = self.queue.unfinished_tasks
+        if left:
+            print(f"[webhook WARNING] Shutting down with {left} update(s) unprocessed")
+        for _ in self._workers:
+            try:
+                self.queue.put(_STOP, timeout=1)
+            except queue.Full:
+                break
+        for w in self._workers:
+            w.join(timeout=1)
+
+def run(bot, config):
+    """
+    Serve updates for `bot` (a TeleBot created with threaded=False) until
+    SIGINT/SIGTERM, then drain and return.
+    """
+    conf = config.get("webhook", {})
+    server = WebhookServer(
+        bot,
+        listen=conf.get("listen", DEFAULT_LISTEN),
+        port=conf.get("port", DEFAULT_PORT),
+        path=conf.get("path", DEFAULT_PATH),
+        secret_token=conf.get("secret_token"),
+        workers=conf.get("workers", DEFAULT_WORKERS),
+        queue_size=conf.get("queue_size", DEFAULT_QUEUE_SIZE)
+    )
+    if conf.get("url"):
+        bot.set_webhook(
+            url=conf["url"],
+            secret_token=conf.get("secret_token"),
+            max_connections=conf.get("workers", DEFAULT_WORKERS) * 5
+        )
+
+    def stop(signum, frame):
+        # httpd.shutdown() blocks until serve_forever returns: call it off the serving thread.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    print(f"[webhook] Listening on {server.httpd.server_address} {server.path}")
+    server.serve_forever()
+    # serve_forever returned: wait for the drain started by the signal handler
+    for w in server._workers:
+        w.join(DRAIN_TIMEOUT + 5)
+    print(f"[webhook] Stopped: {server.stats()}")